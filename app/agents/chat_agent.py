@@ -1,5 +1,5 @@
 """聊天机器人Agent模块，使用纯LCEL架构。"""
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 
 from langchain.memory import ConversationBufferMemory
@@ -9,20 +9,28 @@ from langchain_core.prompts import MessagesPlaceholder
 from langchain_core.runnables import RunnablePassthrough, RunnableLambda
 from langchain_core.messages import ToolMessage, AIMessage
 
+from app.core.logging_config import PROMPT, prompt_logger
 from app.utils.llm import create_llm
 
+logger = logging.getLogger(__name__)
+
 class ChatAgent:
     """聊天机器人Agent实现，使用纯LCEL架构。"""
     
-    def __init__(self, tools: List[BaseTool] = None):
+    def __init__(self, tools: List[BaseTool] = None, model_name: str = "deepseek-chat",
+                 max_tokens: Optional[int] = None,
+                 memory: Optional[ConversationBufferMemory] = None):
         """初始化聊天Agent。
         
         Args:
             tools: Agent可用的工具列表
+            model_name: 使用的模型名称
+            max_tokens: 最大生成token数，默认使用模型配置
+            memory: 对话记忆，可与同一对话的其他聊天模型共享
         """
-        self.llm = create_llm(temperature=0.7)
+        self.llm = create_llm(model_name=model_name, temperature=0.7, max_tokens=max_tokens)
         self.tools = tools or []
-        self.memory = ConversationBufferMemory(
+        self.memory = memory or ConversationBufferMemory(
             memory_key="chat_history",
             return_messages=True
         )
@@ -44,6 +52,7 @@ class ChatAgent:
             MessagesPlaceholder(variable_name="chat_history"),
             ("human", "{input}"),
         ])
+        self.prompt = prompt
         
         # 使用RunnableLambda获取聊天历史
         def get_chat_history(inputs):
@@ -93,6 +102,15 @@ class ChatAgent:
             处理结果
         """
         try:
+            if prompt_logger.isEnabledFor(PROMPT):
+                prompt_messages = self.prompt.format_messages(
+                    input=message,
+                    chat_history=self.memory.load_memory_variables({}).get("chat_history", [])
+                )
+                prompt_logger.log(PROMPT, "%s", "\n".join(
+                    f"{m.type}: {m.content}" for m in prompt_messages
+                ))
+            
             # 使用纯LCEL链处理消息
             result = await self.chain.ainvoke({"input": message})
             
@@ -109,8 +127,9 @@ class ChatAgent:
             }
         except Exception as e:
             # 如果处理失败，返回简单响应
-            logging.error(f"Agent处理消息失败: {str(e)}")
+            logger.error("Agent处理消息失败: %s", e)
             return {
                 "response": "我理解您的问题，但目前处理过程中遇到了一些技术问题。请稍后再试或换一种方式提问。",
-                "thoughts": []
+                "thoughts": [],
+                "failed": True
             }
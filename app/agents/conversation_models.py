@@ -0,0 +1,65 @@
+"""对话级聊天模型集合模块。"""
+from typing import Dict, Union
+
+from langchain.memory import ConversationBufferMemory
+
+from app.agents.chat_agent import ChatAgent
+from app.agents.router import ROUTE_AGENT
+from app.agents.simple_chat import SimpleChat
+from app.agents.tools import create_agent_tools
+from app.utils.llm import get_route_config
+
+
+class ConversationModels:
+    """同一对话在各路由下使用的聊天模型。
+
+    各模型共享同一份对话记忆，因此同一对话中的消息可以在不同路由之间切换，
+    模型本身在首次被路由到时才创建。
+    """
+
+    def __init__(self):
+        """初始化对话模型集合。"""
+        self.memory = ConversationBufferMemory(
+            memory_key="chat_history",
+            return_messages=True
+        )
+        self._models: Dict[str, Union[ChatAgent, SimpleChat]] = {}
+
+    def get(self, route: str) -> Union[ChatAgent, SimpleChat]:
+        """获取（必要时创建）指定路由的聊天模型。
+
+        Args:
+            route: 路由名称
+
+        Returns:
+            聊天模型实例
+        """
+        if route not in self._models:
+            route_config = get_route_config(route)
+            if route == ROUTE_AGENT:
+                self._models[route] = ChatAgent(
+                    tools=create_agent_tools(),
+                    memory=self.memory,
+                    **route_config
+                )
+            else:
+                self._models[route] = SimpleChat(memory=self.memory, **route_config)
+        return self._models[route]
+
+    def has_history(self) -> bool:
+        """对话记忆中是否已有消息。
+
+        Returns:
+            是否已有消息
+        """
+        return bool(self.memory.chat_memory.messages)
+
+    def remember(self, message: str, response: str) -> None:
+        """将未经模型处理（如缓存命中）的一轮对话写入记忆。
+
+        Args:
+            message: 用户消息
+            response: 回复内容
+        """
+        self.memory.chat_memory.add_user_message(message)
+        self.memory.chat_memory.add_ai_message(response)
@@ -0,0 +1,197 @@
+"""按消息选择处理路径的模型路由模块。
+
+每条消息在本地通过启发式规则分类，选择能回答它的最便宜的路径：
+可直接复用答案的寒暄走缓存，需要工具（时间、知识库）的消息走Agent，
+其余走不绑定工具、提示更短的简单聊天。
+
+寒暄答案缓存在所有对话间共享，因此只缓存在空对话历史下生成的回复，
+带历史生成的回复可能包含该对话的上下文（如用户的姓名），不能提供给其他对话。
+"""
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+from app.utils.ttl_cache import MISSING, TTLCache
+from config.deepseek_config import config
+
+logger = logging.getLogger(__name__)
+
+# 路由名称
+ROUTE_CACHE = "cache"
+ROUTE_SIMPLE = "simple"
+ROUTE_AGENT = "agent"
+
+# 需要调用工具才能回答的消息
+_AGENT_PATTERN = re.compile(
+    r"几点|时间|日期|几号|星期|礼拜|知识库|搜索|查询|查找|查一下|资料"
+    r"|chatverse|langchain|fastapi|deepseek"
+    r"|\b(time|date|search|look\s*up|knowledge)\b",
+    re.IGNORECASE
+)
+
+# 与上下文无关、答案可以复用的寒暄
+_SMALL_TALK_PATTERN = re.compile(
+    r"^(你好|您好|嗨|哈喽|在吗|在不在|谢谢|多谢|感谢|谢啦|再见|拜拜|早上好|早安|中午好|下午好|晚上好|晚安"
+    r"|hi|hello|hey|thanks|thank\s+you|bye|goodbye|good\s+(morning|afternoon|evening|night))$",
+    re.IGNORECASE
+)
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s!！。.~～?？,，]+$")
+
+
+class RouteDecision(NamedTuple):
+    """路由决策。"""
+
+    route: str
+    reason: str
+    cache_key: Optional[str] = None
+
+
+def normalize_message(message: str) -> str:
+    """规范化消息，用于寒暄识别与答案缓存键。
+
+    Args:
+        message: 用户消息
+
+    Returns:
+        去除首尾空白与结尾标点并转为小写的消息
+    """
+    return _TRAILING_PUNCTUATION.sub("", message.strip()).lower()
+
+
+class RouteStats:
+    """单个路由的调用统计。"""
+
+    def __init__(self):
+        """初始化统计数据。"""
+        self.count = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.reasons: Dict[str, int] = {}
+
+    def record(self, reason: str, latency: float, failed: bool) -> None:
+        """记录一次路由处理。
+
+        Args:
+            reason: 路由原因
+            latency: 处理耗时（秒）
+            failed: 是否处理失败
+        """
+        self.count += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        if failed:
+            self.failures += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        """导出统计数据。
+
+        Returns:
+            统计数据字典，延迟单位为毫秒
+        """
+        avg = self.total_latency / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "avg_latency_ms": round(avg * 1000, 3),
+            "max_latency_ms": round(self.max_latency * 1000, 3),
+            "reasons": dict(self.reasons),
+        }
+
+
+class ModelRouter:
+    """按消息在缓存、简单聊天与Agent之间路由。"""
+
+    def __init__(self, allow_agent: bool = True, cache_ttl: float = 3600.0, cache_size: int = 1024):
+        """初始化模型路由。
+
+        Args:
+            allow_agent: 是否允许使用Agent，为False时所有消息都走简单聊天
+            cache_ttl: 寒暄答案的缓存时间（秒）
+            cache_size: 寒暄答案的最大缓存条目数
+        """
+        self.allow_agent = allow_agent
+        self._answers = TTLCache(cache_ttl, cache_size)
+        self._stats: Dict[str, RouteStats] = {
+            route: RouteStats() for route in (ROUTE_CACHE, ROUTE_SIMPLE, ROUTE_AGENT)
+        }
+        self._lock = threading.Lock()
+
+    def decide(self, message: str) -> RouteDecision:
+        """为消息选择路由。
+
+        Args:
+            message: 用户消息
+
+        Returns:
+            路由决策
+        """
+        normalized = normalize_message(message)
+        if _SMALL_TALK_PATTERN.match(normalized):
+            if self._answers.get(normalized) is not MISSING:
+                return RouteDecision(ROUTE_CACHE, "small_talk_cached", normalized)
+            return RouteDecision(ROUTE_SIMPLE, "small_talk", normalized)
+        if not self.allow_agent:
+            return RouteDecision(ROUTE_SIMPLE, "agent_disabled")
+        if _AGENT_PATTERN.search(normalized):
+            return RouteDecision(ROUTE_AGENT, "needs_tools")
+        return RouteDecision(ROUTE_SIMPLE, "default")
+
+    async def process_message(self, models, message: str) -> Dict[str, Any]:
+        """按路由处理消息。
+
+        Args:
+            models: 对话的聊天模型集合，需提供 ``get(route)``、``remember(message, response)``
+                与 ``has_history()``
+            message: 用户消息
+
+        Returns:
+            处理结果，``route`` 字段为实际使用的路由
+        """
+        decision = self.decide(message)
+        started = time.perf_counter()
+        if decision.route == ROUTE_CACHE:
+            response = self._answers.get(decision.cache_key)
+            if response is MISSING:
+                # 决策后缓存恰好过期，改走简单聊天
+                decision = RouteDecision(ROUTE_SIMPLE, "small_talk", decision.cache_key)
+            else:
+                models.remember(message, response)
+                result = {"response": response, "thoughts": []}
+
+        if decision.route != ROUTE_CACHE:
+            # 需在处理前判断，处理后记忆中总会有本轮对话
+            cacheable = decision.cache_key is not None and not models.has_history()
+            result = await models.get(decision.route).process_message(message)
+            if cacheable and not result.get("failed"):
+                self._answers.set(decision.cache_key, result["response"])
+
+        latency = time.perf_counter() - started
+        with self._lock:
+            self._stats[decision.route].record(decision.reason, latency, bool(result.get("failed")))
+        # 每条消息都会产生，按采样比例输出
+        logger.info("模型路由", extra={
+            "route": decision.route,
+            "reason": decision.reason,
+            "latency_ms": round(latency * 1000, 3),
+            "sample_rate": config.log_sample_rate,
+        })
+        result["route"] = decision.route
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取各路由的决策次数与延迟统计。
+
+        Returns:
+            以路由名称为键的统计数据
+        """
+        with self._lock:
+            return {route: stats.as_dict() for route, stats in self._stats.items()}
+
+
+# 进程级模型路由
+model_router = ModelRouter(allow_agent=not config.use_simple_chat)
@@ -1,42 +1,52 @@
 """简单聊天模型模块，不使用Agent框架。"""
-from typing import Dict, Any, List
+import logging
+from typing import Dict, Any, List, Optional
 
 from langchain.chains import ConversationChain
 from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.prompts import MessagesPlaceholder
 
+from app.core.logging_config import PROMPT, prompt_logger
 from app.utils.llm import create_llm
 
+logger = logging.getLogger(__name__)
+
 class SimpleChat:
     """简单聊天实现，不使用Agent框架，直接调用LLM。"""
     
-    def __init__(self):
-        """初始化简单聊天模型。"""
-        self.llm = create_llm(temperature=0.7)
+    def __init__(self, model_name: str = "deepseek-chat", max_tokens: Optional[int] = None,
+                 memory: Optional[ConversationBufferMemory] = None):
+        """初始化简单聊天模型。
+        
+        Args:
+            model_name: 使用的模型名称
+            max_tokens: 最大生成token数，默认使用模型配置
+            memory: 对话记忆，可与同一对话的其他聊天模型共享
+        """
+        self.llm = create_llm(model_name=model_name, temperature=0.7, max_tokens=max_tokens)
         
         # 创建记忆
-        self.memory = ConversationBufferMemory(
+        self.memory = memory or ConversationBufferMemory(
             memory_key="chat_history",
             return_messages=True
         )
         
-        # 创建提示模板
-        template = """你是一个友好、有用的AI助手，可以与用户进行对话并解答问题。
-
-聊天历史:
-{chat_history}
-
-人类: {input}
-AI: """
-        
-        prompt = PromptTemplate.from_template(template)
+        # 创建提示模板，聊天历史以消息列表传给模型，而不是渲染成文本
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", "你是一个友好、有用的AI助手，可以与用户进行对话并解答问题。"),
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("human", "{input}"),
+        ])
+        self.prompt = prompt
         
         # 创建对话链
         self.chain = ConversationChain(
             llm=self.llm,
             memory=self.memory,
             prompt=prompt,
-            verbose=True
+            # 完整提示词改由PROMPT级别日志输出，见process_message
+            verbose=False
         )
     
     async def process_message(self, message: str) -> Dict[str, Any]:
@@ -49,6 +59,14 @@ AI: """
             处理结果
         """
         try:
+            if prompt_logger.isEnabledFor(PROMPT):
+                prompt_messages = self.prompt.format_messages(
+                    input=message,
+                    chat_history=self.memory.load_memory_variables({}).get("chat_history", [])
+                )
+                prompt_logger.log(PROMPT, "%s", "\n".join(
+                    f"{m.type}: {m.content}" for m in prompt_messages
+                ))
             result = await self.chain.ainvoke({"input": message})
             return {
                 "response": result.get("response", ""),
@@ -56,9 +74,9 @@ AI: """
             }
         except Exception as e:
             # 错误处理
-            import logging
-            logging.error(f"聊天处理失败: {str(e)}")
+            logger.error("聊天处理失败: %s", e)
             return {
                 "response": "抱歉，我现在无法正确处理您的请求。请稍后再试。",
-                "thoughts": []
+                "thoughts": [],
+                "failed": True
             } 
\ No newline at end of file
@@ -0,0 +1,340 @@
+"""Agent工具运行时模块。
+
+为工具调用提供统一的执行环境：原生异步工具直接在事件循环中等待，
+同步工具按配置卸载到线程池或进程池，避免阻塞服务所有WebSocket的事件循环。
+每个工具都有独立的超时、并发上限、可选的TTL结果缓存以及延迟/错误统计。
+
+超时只让调用方停止等待，已卸载到执行池的工具仍会运行到结束；
+并发名额在工具实际结束后才释放，因此挂起的工具最多占用 ``max_concurrency``
+个工作线程，不会占满共享的执行池。
+"""
+import asyncio
+import inspect
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.utils.ttl_cache import MISSING, TTLCache
+
+# 执行方式
+EXECUTOR_INLINE = "inline"    # 直接在调用方执行，仅适用于极轻量的工具
+EXECUTOR_THREAD = "thread"    # 卸载到线程池，适用于阻塞I/O
+EXECUTOR_PROCESS = "process"  # 卸载到进程池，适用于CPU密集型工具（函数必须可pickle）
+
+class ToolTimeoutError(TimeoutError):
+    """工具执行超时。"""
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """工具的运行时配置。"""
+
+    name: str
+    func: Callable[..., Any]
+    timeout: float = 10.0
+    max_concurrency: int = 4
+    executor: str = EXECUTOR_THREAD
+    cache_ttl: Optional[float] = None  # 仅纯函数工具设置，单位秒
+    cache_size: int = 256
+
+    @property
+    def is_async(self) -> bool:
+        """工具是否为原生异步函数。"""
+        return inspect.iscoroutinefunction(self.func)
+
+
+class ToolStats:
+    """单个工具的调用统计。"""
+
+    def __init__(self):
+        """初始化统计数据。"""
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cache_hits = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, latency: float, error: bool = False, timeout: bool = False) -> None:
+        """记录一次实际执行。
+
+        Args:
+            latency: 执行耗时（秒）
+            error: 是否失败
+            timeout: 是否超时
+        """
+        with self._lock:
+            self.calls += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            if error:
+                self.errors += 1
+            if timeout:
+                self.timeouts += 1
+
+    def record_cache_hit(self) -> None:
+        """记录一次缓存命中。"""
+        with self._lock:
+            self.cache_hits += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        """导出统计数据。
+
+        Returns:
+            统计数据字典，延迟单位为毫秒
+        """
+        with self._lock:
+            avg = self.total_latency / self.calls if self.calls else 0.0
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "cache_hits": self.cache_hits,
+                "avg_latency_ms": round(avg * 1000, 3),
+                "max_latency_ms": round(self.max_latency * 1000, 3),
+            }
+
+
+def _cache_key(args: tuple, kwargs: dict) -> Optional[Hashable]:
+    """根据调用参数生成缓存键，参数不可哈希时返回None。"""
+    key = (args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class ToolRuntime:
+    """工具运行时，负责工具的调度、限流、缓存与统计。"""
+
+    def __init__(self, thread_workers: int = 8, process_workers: int = 2):
+        """初始化工具运行时。
+
+        Args:
+            thread_workers: 线程池大小
+            process_workers: 进程池大小（首次使用时才创建）
+        """
+        self._thread_workers = thread_workers
+        self._process_workers = process_workers
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._specs: Dict[str, ToolSpec] = {}
+        self._stats: Dict[str, ToolStats] = {}
+        self._caches: Dict[str, TTLCache] = {}
+        # 事件循环 -> {工具名称: 信号量}，asyncio信号量只能在一个事件循环中使用
+        self._async_limits: Dict[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]] = {}
+        self._limits_lock = threading.Lock()
+        self._sync_limits: Dict[str, threading.BoundedSemaphore] = {}
+
+    def register(self, spec: ToolSpec) -> ToolSpec:
+        """注册工具。
+
+        Args:
+            spec: 工具运行时配置
+
+        Returns:
+            注册的工具配置
+        """
+        if spec.executor not in (EXECUTOR_INLINE, EXECUTOR_THREAD, EXECUTOR_PROCESS):
+            raise ValueError(f"未知的工具执行方式: {spec.executor}")
+        self._specs[spec.name] = spec
+        self._stats[spec.name] = ToolStats()
+        self._sync_limits[spec.name] = threading.BoundedSemaphore(spec.max_concurrency)
+        if spec.cache_ttl:
+            self._caches[spec.name] = TTLCache(spec.cache_ttl, spec.cache_size)
+        return spec
+
+    def _executor(self, kind: str) -> Executor:
+        """获取（必要时创建）对应的执行池。"""
+        with self._pool_lock:
+            if kind == EXECUTOR_PROCESS:
+                if self._process_pool is None:
+                    self._process_pool = ProcessPoolExecutor(max_workers=self._process_workers)
+                return self._process_pool
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self._thread_workers,
+                    thread_name_prefix="agent-tool"
+                )
+            return self._thread_pool
+
+    def _async_limit(self, spec: ToolSpec) -> asyncio.Semaphore:
+        """获取当前事件循环上的并发信号量。"""
+        loop = asyncio.get_running_loop()
+        limits = self._async_limits.get(loop)
+        if limits is None:
+            with self._limits_lock:
+                # 首次见到新的事件循环时清理已关闭的事件循环（如同步调用中asyncio.run创建的）
+                for closed in [item for item in self._async_limits if item.is_closed()]:
+                    del self._async_limits[closed]
+                limits = self._async_limits.setdefault(loop, {})
+        semaphore = limits.get(spec.name)
+        if semaphore is None:
+            semaphore = limits[spec.name] = asyncio.Semaphore(spec.max_concurrency)
+        return semaphore
+
+    async def _dispatch(self, spec: ToolSpec, args: tuple, kwargs: dict) -> Any:
+        """在并发上限内按配置执行工具。
+
+        卸载到执行池的工具在执行池中实际结束时才释放并发名额，
+        调用方超时取消等待不会提前释放。
+        """
+        semaphore = self._async_limit(spec)
+        await semaphore.acquire()
+        handed_off = False
+        try:
+            if spec.is_async:
+                return await spec.func(*args, **kwargs)
+            if spec.executor == EXECUTOR_INLINE:
+                return spec.func(*args, **kwargs)
+            loop = asyncio.get_running_loop()
+            future = self._executor(spec.executor).submit(spec.func, *args, **kwargs)
+            handed_off = True
+
+            def release(_):
+                try:
+                    loop.call_soon_threadsafe(semaphore.release)
+                except RuntimeError:
+                    pass  # 事件循环已关闭，信号量随之失效
+
+            future.add_done_callback(release)
+            return await asyncio.wrap_future(future)
+        finally:
+            if not handed_off:
+                semaphore.release()
+
+    async def acall(self, name: str, *args, **kwargs) -> Any:
+        """异步调用工具。
+
+        Args:
+            name: 工具名称
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            工具执行结果
+
+        Raises:
+            ToolTimeoutError: 工具在超时时间内未完成（含排队时间）
+        """
+        spec = self._specs[name]
+        stats = self._stats[name]
+        cache = self._caches.get(name)
+        key = _cache_key(args, kwargs) if cache is not None else None
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not MISSING:
+                stats.record_cache_hit()
+                return cached
+
+        start = time.perf_counter()
+        task = asyncio.ensure_future(self._dispatch(spec, args, kwargs))
+        try:
+            # 不使用wait_for：工具自身抛出的TimeoutError不能与调用超时混淆
+            done, _ = await asyncio.wait((task,), timeout=spec.timeout)
+        finally:
+            if not task.done():
+                task.cancel()
+        if not done:
+            stats.record(time.perf_counter() - start, error=True, timeout=True)
+            raise ToolTimeoutError(f"工具 {name} 执行超时（{spec.timeout}秒）")
+        try:
+            result = task.result()
+        except Exception:
+            stats.record(time.perf_counter() - start, error=True)
+            raise
+        stats.record(time.perf_counter() - start)
+        if key is not None:
+            cache.set(key, result)
+        return result
+
+    def call(self, name: str, *args, **kwargs) -> Any:
+        """同步调用工具，供不在事件循环中的调用方使用。
+
+        Args:
+            name: 工具名称
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            工具执行结果
+
+        Raises:
+            ToolTimeoutError: 工具在超时时间内未完成（含排队时间）
+        """
+        spec = self._specs[name]
+        if spec.is_async:
+            return asyncio.run(self.acall(name, *args, **kwargs))
+        stats = self._stats[name]
+        cache = self._caches.get(name)
+        key = _cache_key(args, kwargs) if cache is not None else None
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not MISSING:
+                stats.record_cache_hit()
+                return cached
+
+        start = time.perf_counter()
+        limit = self._sync_limits[name]
+        if not limit.acquire(timeout=spec.timeout):
+            stats.record(time.perf_counter() - start, error=True, timeout=True)
+            raise ToolTimeoutError(f"工具 {name} 排队超时（{spec.timeout}秒）")
+        timed_out = False
+        try:
+            if spec.executor == EXECUTOR_INLINE:
+                try:
+                    result = spec.func(*args, **kwargs)
+                finally:
+                    limit.release()
+            else:
+                try:
+                    future = self._executor(spec.executor).submit(spec.func, *args, **kwargs)
+                except BaseException:
+                    limit.release()
+                    raise
+                # 工具实际结束时才释放并发名额
+                future.add_done_callback(lambda _: limit.release())
+                remaining = max(spec.timeout - (time.perf_counter() - start), 0.0)
+                try:
+                    result = future.result(timeout=remaining)
+                except FutureTimeoutError:
+                    if future.done():
+                        # 工具自身抛出了TimeoutError（或恰好在超时后结束），按普通结果处理
+                        result = future.result()
+                    else:
+                        future.cancel()  # 仍在排队时直接取消
+                        timed_out = True
+        except Exception:
+            stats.record(time.perf_counter() - start, error=True)
+            raise
+        if timed_out:
+            stats.record(time.perf_counter() - start, error=True, timeout=True)
+            raise ToolTimeoutError(f"工具 {name} 执行超时（{spec.timeout}秒）")
+        stats.record(time.perf_counter() - start)
+        if key is not None:
+            cache.set(key, result)
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有工具的统计数据。
+
+        Returns:
+            以工具名称为键的统计数据
+        """
+        return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+    def shutdown(self) -> None:
+        """关闭执行池。"""
+        with self._pool_lock:
+            if self._thread_pool is not None:
+                self._thread_pool.shutdown(wait=False)
+                self._thread_pool = None
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False)
+                self._process_pool = None
@@ -1,10 +1,19 @@
 """Agent工具模块。"""
 import datetime
+import functools
 import json
-from typing import List
+import threading
+from typing import Any, Dict, List, Optional
 
 from langchain.tools import BaseTool, StructuredTool
 
+from app.agents.tool_runtime import EXECUTOR_INLINE, EXECUTOR_THREAD, ToolRuntime, ToolSpec
+
+# 进程级工具运行时与工具列表，所有会话共享
+_runtime = ToolRuntime()
+_tools: Optional[List[BaseTool]] = None
+_tools_lock = threading.Lock()
+
 
 def get_current_time() -> str:
     """获取当前时间。
@@ -45,23 +54,79 @@ def search_knowledge_base(query: str) -> str:
         return f"未找到与'{query}'相关的信息。"
 
 
+def _build_tool(spec: ToolSpec, description: str) -> BaseTool:
+    """将工具注册到运行时并包装为LangChain工具。
+
+    Args:
+        spec: 工具运行时配置
+        description: 工具描述
+
+    Returns:
+        LangChain工具
+    """
+    _runtime.register(spec)
+
+    @functools.wraps(spec.func)
+    def run(*args, **kwargs):
+        return _runtime.call(spec.name, *args, **kwargs)
+
+    @functools.wraps(spec.func)
+    async def arun(*args, **kwargs):
+        return await _runtime.acall(spec.name, *args, **kwargs)
+
+    return StructuredTool.from_function(
+        func=None if spec.is_async else run,
+        coroutine=arun,
+        name=spec.name,
+        description=description,
+    )
+
+
 def create_agent_tools() -> List[BaseTool]:
     """创建Agent可用的工具列表。
-    
+
+    工具在进程内只构建一次，之后的调用返回同一组工具实例。
+
     Returns:
         工具列表
     """
-    tools = [
-        StructuredTool.from_function(
-            func=get_current_time,
-            name="get_current_time",
-            description="获取当前时间",
-        ),
-        StructuredTool.from_function(
-            func=search_knowledge_base,
-            name="search_knowledge_base",
-            description="搜索知识库获取信息",
-        ),
-    ]
-    
-    return tools 
\ No newline at end of file
+    global _tools
+    if _tools is None:
+        with _tools_lock:
+            if _tools is None:
+                _tools = [
+                    _build_tool(
+                        ToolSpec(
+                            name="get_current_time",
+                            func=get_current_time,
+                            timeout=1.0,
+                            executor=EXECUTOR_INLINE,
+                        ),
+                        description="获取当前时间",
+                    ),
+                    _build_tool(
+                        ToolSpec(
+                            name="search_knowledge_base",
+                            func=search_knowledge_base,
+                            timeout=5.0,
+                            executor=EXECUTOR_THREAD,
+                            cache_ttl=300.0,
+                        ),
+                        description="搜索知识库获取信息",
+                    ),
+                ]
+    return list(_tools)
+
+
+def get_tool_stats() -> Dict[str, Dict[str, Any]]:
+    """获取各工具的调用延迟与错误统计。
+
+    Returns:
+        以工具名称为键的统计数据
+    """
+    return _runtime.stats()
+
+
+def shutdown_tools() -> None:
+    """关闭工具运行时的执行池。"""
+    _runtime.shutdown()
@@ -0,0 +1,132 @@
+"""管理API路由。"""
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse, Response
+
+from app.agents.router import model_router
+from app.core.profiling import TurnProfile, profiler
+from app.schemas.admin import ProfilingConfig, ProfilingStatus
+from app.utils.upstream import get_upstream_pool
+from config.deepseek_config import config
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """校验管理令牌依赖。
+    
+    Args:
+        x_admin_token: 请求头 ``X-Admin-Token``
+        
+    Raises:
+        HTTPException: 未配置管理令牌或令牌不匹配
+    """
+    expected = config.admin_token
+    if not expected:
+        raise HTTPException(status_code=403, detail="管理接口未启用")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=401, detail="管理令牌无效")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+def _profiling_status() -> ProfilingStatus:
+    return ProfilingStatus(
+        enabled=profiler.enabled,
+        sample_rate=profiler.sample_rate,
+        capacity=profiler.capacity,
+        profiles=[record.summary() for record in profiler.profiles()]
+    )
+
+
+def _get_profile(profile_id: int) -> TurnProfile:
+    record = profiler.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="剖析记录不存在")
+    return record
+
+
+@router.get("/profiling", response_model=ProfilingStatus)
+async def get_profiling():
+    """获取请求剖析状态与已采集的剖析记录。"""
+    return _profiling_status()
+
+
+@router.put("/profiling", response_model=ProfilingStatus)
+async def configure_profiling(profiling_config: ProfilingConfig):
+    """开启或关闭请求剖析。
+    
+    Args:
+        profiling_config: 剖析配置
+        
+    Returns:
+        修改后的剖析状态
+    """
+    profiler.configure(
+        enabled=profiling_config.enabled,
+        sample_rate=profiling_config.sample_rate,
+        capacity=profiling_config.capacity
+    )
+    return _profiling_status()
+
+
+@router.delete("/profiling", status_code=204)
+async def clear_profiles():
+    """清空已采集的剖析记录。"""
+    profiler.clear()
+
+
+@router.get("/profiling/{profile_id}/pstats")
+async def download_pstats(profile_id: int):
+    """下载pstats格式的剖析结果。
+    
+    Args:
+        profile_id: 剖析记录ID
+        
+    Returns:
+        pstats二进制文件
+    """
+    record = _get_profile(profile_id)
+    return Response(
+        content=record.to_pstats(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.pstats"'}
+    )
+
+
+@router.get("/profiling/{profile_id}/collapsed")
+async def download_collapsed(profile_id: int):
+    """下载折叠栈格式的剖析结果，可直接用于生成火焰图。
+    
+    Args:
+        profile_id: 剖析记录ID
+        
+    Returns:
+        折叠栈文本文件
+    """
+    record = _get_profile(profile_id)
+    return PlainTextResponse(
+        content=record.to_collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.collapsed"'}
+    )
+
+
+@router.get("/routing")
+async def routing_stats():
+    """获取模型路由的决策次数与各路由延迟统计。"""
+    return model_router.stats()
+
+
+@router.get("/tools")
+async def tool_stats():
+    """获取各Agent工具的调用次数、超时、缓存命中与延迟统计。"""
+    # 延迟导入，管理接口的其余部分不依赖LangChain工具模块
+    from app.agents.tools import get_tool_stats
+    return get_tool_stats()
+
+
+@router.get("/upstreams")
+async def upstream_stats():
+    """获取上游端点池的选择策略与各端点状态、延迟和错误统计。"""
+    return get_upstream_pool().stats()
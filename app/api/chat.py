@@ -1,229 +1,466 @@
 """聊天API路由。"""
+import asyncio
+import functools
 import json
 import logging
-import os
 import uuid
-from typing import Dict, Union
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
 
-from app.agents.chat_agent import ChatAgent
-from app.agents.simple_chat import SimpleChat
-from app.agents.tools import create_agent_tools
-from app.schemas.chat import ChatRequest, ChatResponse
+from app.agents.conversation_models import ConversationModels
+from app.agents.router import ROUTE_SIMPLE, model_router
+from app.api.admin import require_admin
+from app.core.logging_config import log_context, set_log_conversation
+from app.core.profiling import profiler
+from app.schemas.chat import ChatRequest, ChatResponse, ForkResponse, SearchResponse
 from app.services.chat_service import ChatService
+from app.services.idempotency import IdempotencyConflictError, IdempotencyStore, request_fingerprint
+from config.deepseek_config import config
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+logger = logging.getLogger(__name__)
 
-# 缓存聊天模型实例
-_chat_cache: Dict[str, Union[ChatAgent, SimpleChat]] = {}
 
-# 检查是否使用简单聊天模式
-USE_SIMPLE_CHAT = os.getenv('USE_SIMPLE_CHAT', 'false').lower() == 'true'
+# 缓存各对话的聊天模型实例
+_chat_cache: Dict[str, ConversationModels] = {}
+
+# 进程内共享的聊天服务，保证历史记录与检索索引在各请求间一致
+_chat_service = ChatService(
+    data_dir=config.chat_data_dir,
+    spill_dir=config.chat_spill_dir,
+    idle_seconds=config.chat_idle_seconds,
+    codec=config.chat_spill_codec,
+    spill_batch=config.chat_spill_batch
+)
+
+
+def _evict_chat_models(conversation_ids):
+    """对话转存到磁盘时一并释放其聊天模型，再次访问时从历史记录重建。"""
+    for conversation_id in conversation_ids:
+        _chat_cache.pop(conversation_id, None)
+
+
+_chat_service.add_spill_listener(_evict_chat_models)
+
+# 按Idempotency-Key合并重试请求，避免重复调用LLM和重复写入历史记录
+_idempotency = IdempotencyStore(ttl=config.idempotency_ttl, maxsize=config.idempotency_max_keys)
+
+# 幂等键的最大长度
+_MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+# 各对话的处理锁，保证同一对话的轮次按顺序执行（对话不再使用时自动释放）
+_conversation_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
 
 
 def get_chat_service():
     """获取聊天服务依赖。"""
-    return ChatService()
+    return _chat_service
 
 
-@router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket聊天端点。"""
-    await websocket.accept()
+def _restore_memory(chat_models: ConversationModels, conversation_id: str) -> None:
+    """用已保存的历史记录恢复对话记忆。
+    
+    Args:
+        chat_models: 新创建的对话模型集合
+        conversation_id: 对话ID
+    """
+    for message in _chat_service.get_messages(conversation_id):
+        if message.role == "user":
+            chat_models.memory.chat_memory.add_user_message(message.content)
+        elif message.role == "assistant":
+            chat_models.memory.chat_memory.add_ai_message(message.content)
+
+
+def _conversation_lock(conversation_id: str) -> asyncio.Lock:
+    """获取对话的处理锁。
+    
+    Args:
+        conversation_id: 对话ID
+        
+    Returns:
+        对话的处理锁
+    """
+    lock = _conversation_locks.get(conversation_id)
+    if lock is None:
+        lock = _conversation_locks[conversation_id] = asyncio.Lock()
+    return lock
+
+
+def _get_chat_models(conversation_id: str) -> ConversationModels:
+    """获取或创建对话的聊天模型集合，具体模型在首次被路由到时才创建。
+    
+    Args:
+        conversation_id: 对话ID
+        
+    Returns:
+        对话模型集合
+    """
+    if conversation_id not in _chat_cache:
+        _chat_cache[conversation_id] = ConversationModels()
+        _restore_memory(_chat_cache[conversation_id], conversation_id)
+    
+    return _chat_cache[conversation_id]
+
+
+async def _process_ws_turn(
+    send: Callable[[Dict[str, Any]], Awaitable[None]],
+    chat_service: ChatService,
+    conversation_id: str,
+    user_message: str
+) -> None:
+    """处理WebSocket连接上的一轮对话。
     
-    # 默认创建新的会话ID
-    conversation_id = str(uuid.uuid4())
-    chat_service = ChatService()
+    用户消息在得到回复后与回复一起保存，轮次被取消时不会留下没有回复的用户消息。
+    
+    Args:
+        send: 发送消息帧的协程函数
+        chat_service: 聊天服务实例
+        conversation_id: 对话ID
+        user_message: 用户消息
+    """
+    # 发送正在处理的消息
+    await send({
+        "type": "thinking",
+        "content": "正在思考...",
+        "conversation_id": conversation_id
+    })
     
     try:
-        while True:
-            # 接收消息
-            data = await websocket.receive_text()
-            try:
-                # 解析消息
-                message_data = json.loads(data)
-                user_message = message_data.get("message", "")
-                # 如果客户端提供了会话ID，则使用它
-                if message_data.get("conversation_id"):
-                    conversation_id = message_data.get("conversation_id")
-            except json.JSONDecodeError:
-                # 如果不是JSON，直接使用文本作为消息
-                user_message = data
+        # 获取或创建聊天模型
+        with profiler.stage("model_setup"):
+            chat_models = _get_chat_models(conversation_id)
+        
+        # 处理消息
+        with profiler.stage("llm"):
+            result = await model_router.process_message(chat_models, user_message)
+        
+        # 保存对话记录
+        with profiler.stage("save_message"):
+            chat_service.save_message(
+                conversation_id=conversation_id,
+                role="user",
+                content=user_message
+            )
+            chat_service.save_message(
+                conversation_id=conversation_id,
+                role="assistant",
+                content=result["response"]
+            )
+        
+        # 发送响应
+        await send({
+            "type": "response",
+            "content": result["response"],
+            "conversation_id": conversation_id
+        })
+        
+    except Exception as e:
+        # 记录错误
+        logger.error("WebSocket处理消息时发生错误: %s", e)
+        
+        # 尝试简单回退方案
+        try:
+            # 如果常规方法失败，尝试直接使用简单聊天
+            logger.info("切换到简单聊天模式")
+            chat_model = _get_chat_models(conversation_id).get(ROUTE_SIMPLE)
+            with profiler.stage("fallback_llm"):
+                result = await chat_model.process_message(user_message)
             
-            # 发送正在处理的消息
-            await websocket.send_json({
-                "type": "thinking",
-                "content": "正在思考...",
+            # 保存对话记录
+            chat_service.save_message(
+                conversation_id=conversation_id,
+                role="user",
+                content=user_message
+            )
+            chat_service.save_message(
+                conversation_id=conversation_id,
+                role="assistant",
+                content=result["response"]
+            )
+            
+            # 发送响应
+            await send({
+                "type": "response",
+                "content": result["response"],
                 "conversation_id": conversation_id
             })
             
+        except Exception as inner_e:
+            logger.error("WebSocket备选方案也失败了: %s", inner_e)
+            
+            # 发送错误响应
+            fallback_response = "抱歉，我现在无法处理您的请求。可能是网络问题或API限制。请稍后再试。"
+            
             try:
-                # 获取或创建聊天模型
-                if conversation_id not in _chat_cache:
-                    if USE_SIMPLE_CHAT:
-                        # 使用简单聊天模型
-                        logging.info("使用简单聊天模型")
-                        _chat_cache[conversation_id] = SimpleChat()
-                    else:
-                        # 使用Agent
-                        logging.info("使用Agent聊天模型")
-                        tools = create_agent_tools()
-                        _chat_cache[conversation_id] = ChatAgent(tools=tools)
-                
-                chat_model = _chat_cache[conversation_id]
-                
-                # 保存用户消息
                 chat_service.save_message(
                     conversation_id=conversation_id,
                     role="user",
                     content=user_message
                 )
-                
-                # 处理消息
-                result = await chat_model.process_message(user_message)
-                
-                # 保存助手回复
                 chat_service.save_message(
                     conversation_id=conversation_id,
                     role="assistant",
-                    content=result["response"]
+                    content=fallback_response
                 )
-                
-                # 发送响应
-                await websocket.send_json({
-                    "type": "response",
-                    "content": result["response"],
-                    "conversation_id": conversation_id
-                })
-                
-            except Exception as e:
-                # 记录错误
-                logging.error(f"WebSocket处理消息时发生错误: {str(e)}")
-                
-                # 尝试简单回退方案
-                try:
-                    # 如果常规方法失败，尝试直接使用简单聊天
-                    if not isinstance(_chat_cache.get(conversation_id), SimpleChat):
-                        _chat_cache[conversation_id] = SimpleChat()
-                        logging.info("切换到简单聊天模式")
-                        
-                    chat_model = _chat_cache[conversation_id]
-                    result = await chat_model.process_message(user_message)
-                    
-                    # 保存对话记录
-                    chat_service.save_message(
-                        conversation_id=conversation_id,
-                        role="user",
-                        content=user_message
-                    )
-                    chat_service.save_message(
-                        conversation_id=conversation_id,
-                        role="assistant",
-                        content=result["response"]
-                    )
-                    
-                    # 发送响应
-                    await websocket.send_json({
-                        "type": "response",
-                        "content": result["response"],
-                        "conversation_id": conversation_id
-                    })
-                    
-                except Exception as inner_e:
-                    logging.error(f"WebSocket备选方案也失败了: {str(inner_e)}")
-                    
-                    # 发送错误响应
-                    fallback_response = "抱歉，我现在无法处理您的请求。可能是网络问题或API限制。请稍后再试。"
-                    
-                    try:
-                        chat_service.save_message(
-                            conversation_id=conversation_id,
-                            role="assistant",
-                            content=fallback_response
-                        )
-                    except:
-                        pass
-                    
-                    await websocket.send_json({
-                        "type": "error",
-                        "content": fallback_response,
-                        "conversation_id": conversation_id
-                    })
+            except:
+                pass
+            
+            await send({
+                "type": "error",
+                "content": fallback_response,
+                "conversation_id": conversation_id
+            })
+
+
+class _WebSocketSession:
+    """一个WebSocket连接上的多路复用会话。
+    
+    每个消息帧携带 ``conversation_id`` 与 ``request_id``，各轮次作为独立任务并发处理：
+    
+    - 同时处理的轮次数受连接级信号量限制，排队轮次过多时直接拒绝；
+    - 同一对话的轮次由对话锁串行执行，保证历史记录与记忆的顺序；
+    - 发送经有界队列由单独的写任务完成，客户端读取过慢时处理中的轮次等待，
+      拒绝消息时接收循环也会等待（背压），每个请求最终都会收到
+      ``response``、``error`` 或 ``cancelled`` 之一；
+    - ``{"type": "cancel", "request_id": ...}`` 取消尚未完成的轮次。
+    
+    未携带 ``request_id`` 的旧客户端仍然可用：服务端生成请求ID，
+    未携带 ``conversation_id`` 的消息沿用该连接上次使用的对话。
+    """
+    
+    def __init__(self, websocket: WebSocket, chat_service: ChatService):
+        """初始化会话。
+        
+        Args:
+            websocket: 已接受的WebSocket连接
+            chat_service: 聊天服务实例
+        """
+        self.websocket = websocket
+        self.chat_service = chat_service
+        self.conversation_id = str(uuid.uuid4())
+        self._outbound: asyncio.Queue = asyncio.Queue(maxsize=config.ws_send_queue_size)
+        self._limit = asyncio.Semaphore(config.ws_max_concurrent_turns)
+        self._turns: Dict[str, asyncio.Task] = {}
+        # 已创建但尚未开始运行的轮次：请求ID -> 对话ID
+        self._unstarted: Dict[str, str] = {}
+        self._closed = False
+    
+    async def run(self) -> None:
+        """接收并分发消息，直到连接断开。"""
+        writer = asyncio.create_task(self._write())
+        try:
+            while True:
+                await self._dispatch(await self.websocket.receive_text())
+        finally:
+            self._closed = True
+            for task in list(self._turns.values()):
+                task.cancel()
+            writer.cancel()
+    
+    async def _write(self) -> None:
+        """按顺序发送队列中的消息帧。"""
+        while True:
+            frame = await self._outbound.get()
+            await self.websocket.send_json(frame)
+    
+    async def _dispatch(self, data: str) -> None:
+        """解析一个入站消息帧并启动或取消对应的轮次。
+        
+        Args:
+            data: 入站文本
+        """
+        try:
+            message_data = json.loads(data)
+        except json.JSONDecodeError:
+            # 如果不是JSON，直接使用文本作为消息
+            message_data = None
+        if not isinstance(message_data, dict):
+            message_data = {"message": data}
+        
+        request_id = str(message_data.get("request_id") or uuid.uuid4())
+        if message_data.get("type") == "cancel":
+            task = self._turns.get(request_id)
+            if task is not None:
+                task.cancel()
+                # 尚未开始运行的任务被取消时不会执行其中的异常处理，由这里通知客户端
+                conversation_id = self._unstarted.pop(request_id, None)
+                if conversation_id is not None:
+                    await self._outbound.put(self._cancelled_frame(conversation_id, request_id))
+            return
+        
+        # 如果客户端提供了会话ID，则使用它
+        if message_data.get("conversation_id"):
+            self.conversation_id = str(message_data["conversation_id"])
+        conversation_id = self.conversation_id
+        
+        if request_id in self._turns or len(self._turns) >= config.ws_max_pending_turns:
+            await self._outbound.put({
+                "type": "error",
+                "content": "请求ID重复或处理中的请求过多，请稍后再试。",
+                "conversation_id": conversation_id,
+                "request_id": request_id
+            })
+            return
+        
+        task = asyncio.create_task(
+            self._run_turn(request_id, conversation_id, message_data.get("message", ""))
+        )
+        self._turns[request_id] = task
+        self._unstarted[request_id] = conversation_id
+        task.add_done_callback(lambda _: self._turns.pop(request_id, None))
+    
+    @staticmethod
+    def _cancelled_frame(conversation_id: str, request_id: str) -> Dict[str, Any]:
+        return {
+            "type": "cancelled",
+            "conversation_id": conversation_id,
+            "request_id": request_id
+        }
+    
+    async def _run_turn(self, request_id: str, conversation_id: str, user_message: str) -> None:
+        """在并发限制与对话锁内处理一轮对话。
+        
+        Args:
+            request_id: 请求ID
+            conversation_id: 对话ID
+            user_message: 用户消息
+        """
+        self._unstarted.pop(request_id, None)
+        
+        async def send(frame: Dict[str, Any]) -> None:
+            frame["request_id"] = request_id
+            await self._outbound.put(frame)
+        
+        try:
+            async with _conversation_lock(conversation_id), self._limit:
+                with log_context(conversation_id), profiler.turn("/chat/ws", conversation_id):
+                    await _process_ws_turn(send, self.chat_service, conversation_id, user_message)
+        except asyncio.CancelledError:
+            # 连接关闭时写任务已停止，无需再通知客户端
+            if not self._closed:
+                await self._outbound.put(self._cancelled_frame(conversation_id, request_id))
+
+
+@router.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    """WebSocket聊天端点，支持在一个连接上并发处理多个对话。"""
+    await websocket.accept()
+    session = _WebSocketSession(websocket, get_chat_service())
     
+    try:
+        await session.run()
     except WebSocketDisconnect:
-        logging.info(f"WebSocket客户端断开连接")
+        logger.info("WebSocket客户端断开连接")
     except Exception as e:
-        logging.error(f"WebSocket连接错误: {str(e)}")
+        logger.error("WebSocket连接错误: %s", e)
 
 
 @router.post("/message", response_model=ChatResponse)
 async def chat_message(
     request: ChatRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     chat_service: ChatService = Depends(get_chat_service)
 ):
     """处理聊天消息。
     
+    携带 ``Idempotency-Key`` 请求头时，相同键的重试请求不会再次调用LLM：
+    执行中的请求共享同一个结果，已成功完成的请求直接返回保存的响应
+    （响应头 ``Idempotent-Replayed: true``）。失败的轮次（返回备选回复）不会保存，
+    重试时会重新处理。
+    
     Args:
         request: 聊天请求
+        response: 响应对象，用于设置响应头
+        idempotency_key: 幂等键
         chat_service: 聊天服务实例
         
     Returns:
         聊天响应
     """
+    if not idempotency_key:
+        chat_response, _ = await _run_chat_turn(request, chat_service)
+        return chat_response
+    if len(idempotency_key) > _MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key过长")
+    
+    fingerprint = request_fingerprint(request.model_dump())
+    try:
+        result, replayed = await _idempotency.run(
+            idempotency_key,
+            fingerprint,
+            lambda: _run_chat_turn(request, chat_service)
+        )
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
+async def _run_chat_turn(request: ChatRequest, chat_service: ChatService) -> Tuple[ChatResponse, bool]:
+    """在剖析上下文中处理一条HTTP聊天消息，返回(聊天响应, 是否成功)。"""
+    with profiler.turn("/chat/message", request.conversation_id):
+        return await _handle_chat_message(request, chat_service)
+
+
+async def _handle_chat_message(request: ChatRequest, chat_service: ChatService) -> Tuple[ChatResponse, bool]:
+    """处理一条HTTP聊天消息。
+    
+    Args:
+        request: 聊天请求
+        chat_service: 聊天服务实例
+        
+    Returns:
+        (聊天响应, 是否成功)，模型处理失败而返回备选回复时为失败
+    """
     try:
         # 生成或使用现有的会话ID
         conversation_id = request.conversation_id or str(uuid.uuid4())
+        profiler.set_conversation(conversation_id)
+        set_log_conversation(conversation_id)
         
         # 获取或创建聊天模型
-        if conversation_id not in _chat_cache:
-            if USE_SIMPLE_CHAT:
-                # 使用简单聊天模型
-                logging.info("使用简单聊天模型")
-                _chat_cache[conversation_id] = SimpleChat()
-            else:
-                # 使用Agent
-                logging.info("使用Agent聊天模型")
-                tools = create_agent_tools()
-                _chat_cache[conversation_id] = ChatAgent(tools=tools)
-        
-        chat_model = _chat_cache[conversation_id]
+        with profiler.stage("model_setup"):
+            chat_models = _get_chat_models(conversation_id)
         
         # 处理消息
-        result = await chat_model.process_message(request.message)
+        with profiler.stage("llm"):
+            result = await model_router.process_message(chat_models, request.message)
         
         # 保存对话记录
-        chat_service.save_message(
-            conversation_id=conversation_id,
-            role="user",
-            content=request.message
-        )
-        chat_service.save_message(
-            conversation_id=conversation_id,
-            role="assistant",
-            content=result["response"]
-        )
+        with profiler.stage("save_message"):
+            chat_service.save_message(
+                conversation_id=conversation_id,
+                role="user",
+                content=request.message
+            )
+            chat_service.save_message(
+                conversation_id=conversation_id,
+                role="assistant",
+                content=result["response"]
+            )
         
         return ChatResponse(
             response=result["response"],
             conversation_id=conversation_id,
             thoughts=result.get("thoughts")
-        )
+        ), not result.get("failed")
     except Exception as e:
         # 记录错误
-        logging.error(f"处理消息时发生错误: {str(e)}")
+        logger.error("处理消息时发生错误: %s", e)
         
         # 尝试简单回退方案
         try:
             # 如果常规方法失败，尝试直接使用简单聊天
             if 'conversation_id' in locals() and conversation_id in _chat_cache:
-                if not isinstance(_chat_cache[conversation_id], SimpleChat):
-                    _chat_cache[conversation_id] = SimpleChat()
-                    logging.info("切换到简单聊天模式")
-                    
-                chat_model = _chat_cache[conversation_id]
-                result = await chat_model.process_message(request.message)
+                logger.info("切换到简单聊天模式")
+                chat_model = _chat_cache[conversation_id].get(ROUTE_SIMPLE)
+                with profiler.stage("fallback_llm"):
+                    result = await chat_model.process_message(request.message)
                 
                 # 保存对话记录
                 chat_service.save_message(
@@ -241,9 +478,9 @@ async def chat_message(
                     response=result["response"],
                     conversation_id=conversation_id,
                     thoughts=[]
-                )
+                ), not result.get("failed")
         except Exception as inner_e:
-            logging.error(f"备选方案也失败了: {str(inner_e)}")
+            logger.error("备选方案也失败了: %s", inner_e)
         
         # 生成备选响应
         fallback_response = "抱歉，我现在无法处理您的请求。可能是网络问题或API限制。请稍后再试。"
@@ -270,7 +507,7 @@ async def chat_message(
                 response=fallback_response,
                 conversation_id=conversation_id,
                 thoughts=[]
-            )
+            ), False
         
         # 如果没有会话ID，创建新的
         new_conversation_id = str(uuid.uuid4())
@@ -278,7 +515,85 @@ async def chat_message(
             response=fallback_response,
             conversation_id=new_conversation_id,
             thoughts=[]
-        )
+        ), False
+
+
+@router.get("/search", response_model=SearchResponse, dependencies=[Depends(require_admin)])
+async def search_messages(
+    q: str = Query(..., min_length=1, description="查询文本"),
+    role: Optional[str] = Query(None, description="只返回该角色的消息，如'user'或'assistant'"),
+    start_time: Optional[float] = Query(None, description="最早时间戳（含）"),
+    end_time: Optional[float] = Query(None, description="最晚时间戳（含）"),
+    page: int = Query(1, ge=1, description="页码，从1开始"),
+    page_size: int = Query(20, ge=1, le=100, description="每页数量"),
+    chat_service: ChatService = Depends(get_chat_service)
+):
+    """全文检索所有对话的历史消息，供客服与分析人员使用，需要管理令牌。
+    
+    Args:
+        q: 查询文本
+        role: 角色过滤
+        start_time: 最早时间戳
+        end_time: 最晚时间戳
+        page: 页码
+        page_size: 每页数量
+        chat_service: 聊天服务实例
+        
+    Returns:
+        按相关性排序的检索结果
+    """
+    # 检索是CPU密集的，放到线程池中执行，避免阻塞所有WebSocket连接所在的事件循环
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(
+        chat_service.search,
+        q,
+        role=role,
+        start_time=start_time,
+        end_time=end_time,
+        page=page,
+        page_size=page_size
+    ))
+
+
+@router.get("/storage/stats")
+async def storage_stats(chat_service: ChatService = Depends(get_chat_service)):
+    """获取对话历史分层存储统计。
+    
+    Args:
+        chat_service: 聊天服务实例
+        
+    Returns:
+        常驻内存与转存到磁盘的对话数和字节数
+    """
+    return chat_service.storage_stats()
+
+
+@router.post("/{conversation_id}/fork", response_model=ForkResponse)
+async def fork_conversation(
+    conversation_id: str,
+    at: Optional[int] = Query(None, ge=0, description="分叉位置，分支包含原对话的前at条消息，默认为全部消息"),
+    chat_service: ChatService = Depends(get_chat_service)
+):
+    """从对话的某条消息处创建分支，用于编辑历史消息后重新生成。
+    
+    分支与原对话共享前缀消息，分支的对话记忆在首次对话时从历史记录重建。
+    
+    Args:
+        conversation_id: 原对话ID
+        at: 分叉位置
+        chat_service: 聊天服务实例
+        
+    Returns:
+        分支对话信息
+    """
+    new_conversation_id = str(uuid.uuid4())
+    try:
+        at = chat_service.fork_conversation(conversation_id, new_conversation_id, at=at)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if at is None:
+        raise HTTPException(status_code=404, detail="对话记录不存在")
+    return ForkResponse(conversation_id=new_conversation_id, parent_id=conversation_id, at=at)
 
 
 @router.get("/history/{conversation_id}")
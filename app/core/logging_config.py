@@ -0,0 +1,173 @@
+"""异步结构化日志配置模块。
+
+日志记录在调用线程中只做过滤和入队，格式化与I/O由后台监听线程完成，
+避免日志写入阻塞事件循环。输出为每行一个JSON对象（也可切换为文本格式），
+并自动附带当前对话ID作为关联ID。
+
+- 关联ID：在处理某个对话时使用 ``log_context(conversation_id)``；
+- 采样：高频事件通过 ``extra={"sample_rate": 0.01}`` 只保留一部分；
+- 提示词：完整提示词只在 ``app.prompts`` 日志器启用 ``PROMPT`` 级别时输出。
+"""
+import atexit
+import contextlib
+import contextvars
+import copy
+import datetime
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterator, Optional
+
+# 比DEBUG更详细的级别，用于输出完整提示词
+PROMPT = 5
+logging.addLevelName(PROMPT, "PROMPT")
+
+# 提示词日志器
+prompt_logger = logging.getLogger("app.prompts")
+
+_conversation_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "log_conversation_id", default=None
+)
+
+# LogRecord的标准属性，其余属性视为结构化字段
+_RESERVED = set(logging.makeLogRecord({}).__dict__) | {"message", "conversation_id", "sample_rate"}
+
+_listener: Optional[QueueListener] = None
+
+
+@contextlib.contextmanager
+def log_context(conversation_id: Optional[str]) -> Iterator[None]:
+    """在上下文内为日志附带对话ID。
+
+    Args:
+        conversation_id: 对话ID
+    """
+    token = _conversation_id.set(conversation_id)
+    try:
+        yield
+    finally:
+        _conversation_id.reset(token)
+
+
+def set_log_conversation(conversation_id: Optional[str]) -> None:
+    """为当前上下文（请求所在的任务）设置日志对话ID。
+
+    Args:
+        conversation_id: 对话ID
+    """
+    _conversation_id.set(conversation_id)
+
+
+class ContextFilter(logging.Filter):
+    """在发出日志的线程中注入对话ID，并按采样率丢弃高频事件。"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        sample_rate = getattr(record, "sample_rate", None)
+        if sample_rate is not None and random.random() >= sample_rate:
+            return False
+        record.conversation_id = _conversation_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """将日志记录格式化为单行JSON。"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        conversation_id = getattr(record, "conversation_id", None)
+        if conversation_id:
+            payload["conversation_id"] = conversation_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """带对话ID的文本格式。"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - [%(conversation_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "conversation_id"):
+            record.conversation_id = None
+        return super().format(record)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """只入队不阻塞的队列处理器，队列满时丢弃日志并计数。"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 在调用线程中固化消息与异常文本，保留结构化字段供监听线程格式化
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(level: str = "INFO", fmt: str = "json", log_prompts: bool = False,
+                  queue_size: int = 10000) -> None:
+    """配置根日志器使用队列异步输出，可重复调用（只生效一次）。
+
+    Args:
+        level: 日志级别，"PROMPT"表示DEBUG级别并输出完整提示词
+        fmt: 输出格式，"json"或"text"
+        log_prompts: 是否输出完整提示词（``PROMPT`` 级别）
+        queue_size: 日志队列容量，满时丢弃新日志而不阻塞
+    """
+    global _listener
+    if _listener is not None:
+        return
+    if level.upper() == "PROMPT":
+        level, log_prompts = "DEBUG", True
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+    prompt_logger.setLevel(PROMPT if log_prompts else logging.INFO)
+
+    _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """停止后台日志线程并输出队列中剩余的日志。"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,273 @@
+"""按需请求性能剖析模块。
+
+管理员开启后，按采样率对聊天请求的单轮处理进行cProfile剖析，
+连同各阶段耗时保存在有界环形缓冲区中，可导出为pstats文件或
+火焰图工具（flamegraph.pl、speedscope等）可读取的折叠栈格式。
+关闭时 ``turn``/``stage`` 只做一次布尔判断，不产生额外开销。
+
+注意：cProfile按线程工作，同一时刻只能有一个剖析在进行，
+因此并发的请求中只有一个会被采样；剖析期间在同一事件循环上
+交错执行的其他协程也会计入该剖析结果。
+"""
+import contextlib
+import contextvars
+import cProfile
+import itertools
+import marshal
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+# 折叠栈的最大深度，避免病态调用图展开过深
+MAX_STACK_DEPTH = 64
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+FuncKey = Tuple[str, int, str]
+
+
+class TurnProfile:
+    """一次被采样的聊天轮次剖析结果。"""
+
+    def __init__(self, profile_id: int, endpoint: str, conversation_id: Optional[str]):
+        """初始化剖析记录。
+
+        Args:
+            profile_id: 剖析记录ID
+            endpoint: 请求端点
+            conversation_id: 对话ID
+        """
+        self.id = profile_id
+        self.endpoint = endpoint
+        self.conversation_id = conversation_id
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.stages: Dict[str, float] = {}
+        self.stats: Dict[FuncKey, tuple] = {}
+
+    def summary(self) -> Dict[str, Any]:
+        """导出剖析记录摘要。
+
+        Returns:
+            不含调用统计的摘要字典
+        """
+        return {
+            "id": self.id,
+            "endpoint": self.endpoint,
+            "conversation_id": self.conversation_id,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "stages": {name: round(ms, 3) for name, ms in self.stages.items()},
+        }
+
+    def to_pstats(self) -> bytes:
+        """导出为pstats文件内容，可用 ``pstats.Stats(path)`` 或snakeviz打开。
+
+        Returns:
+            pstats格式的二进制数据
+        """
+        return marshal.dumps(self.stats)
+
+    def to_collapsed(self) -> str:
+        """导出为折叠栈格式，每行为 ``帧1;帧2;... 微秒数``。
+
+        cProfile只记录调用者与被调用者之间的边，因此完整调用路径的耗时
+        按各调用边占函数总耗时的比例分摊得到。
+
+        Returns:
+            折叠栈文本
+        """
+        children: Dict[FuncKey, List[Tuple[FuncKey, float]]] = {}
+        roots = []
+        for func, (_, _, _, _, callers) in self.stats.items():
+            known_callers = [caller for caller in callers if caller in self.stats]
+            if not known_callers:
+                roots.append(func)
+            for caller in known_callers:
+                children.setdefault(caller, []).append((func, callers[caller][3]))
+
+        samples: Dict[str, float] = {}
+
+        def walk(func: FuncKey, inclusive: float, stack: List[str], seen: set) -> None:
+            total = self.stats[func][3]
+            fraction = inclusive / total if total else 0.0
+            stack.append(_frame_label(func))
+            self_time = self.stats[func][2] * fraction
+            if self_time > 0:
+                key = ";".join(stack)
+                samples[key] = samples.get(key, 0.0) + self_time
+            if len(stack) < MAX_STACK_DEPTH:
+                seen.add(func)
+                for child, edge_time in children.get(func, []):
+                    if child not in seen:
+                        walk(child, edge_time * fraction, stack, seen)
+                seen.discard(func)
+            stack.pop()
+
+        for root in roots:
+            walk(root, self.stats[root][3], [], set())
+
+        lines = [
+            f"{stack} {int(seconds * 1_000_000)}"
+            for stack, seconds in samples.items()
+            if seconds * 1_000_000 >= 1
+        ]
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _frame_label(func: FuncKey) -> str:
+    """生成折叠栈中的帧名称（不能包含分号）。"""
+    filename, line, name = func
+    if filename == "~":
+        label = name
+    else:
+        label = f"{name} ({os.path.basename(filename)}:{line})"
+    return label.replace(";", ",")
+
+
+class Profiler:
+    """按需采样的请求剖析器。"""
+
+    def __init__(self, capacity: int = 20):
+        """初始化剖析器，默认关闭。
+
+        Args:
+            capacity: 环形缓冲区保留的剖析记录数
+        """
+        self.enabled = False
+        self.sample_rate = 1.0
+        self._profiles: Deque[TurnProfile] = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._active = threading.Lock()
+        self._current: contextvars.ContextVar[Optional[TurnProfile]] = contextvars.ContextVar(
+            "current_turn_profile", default=None
+        )
+
+    @property
+    def capacity(self) -> int:
+        """环形缓冲区容量。"""
+        return self._profiles.maxlen
+
+    def configure(self, enabled: bool, sample_rate: Optional[float] = None,
+                  capacity: Optional[int] = None) -> None:
+        """修改剖析配置。
+
+        Args:
+            enabled: 是否开启剖析
+            sample_rate: 采样比例，0到1之间
+            capacity: 环形缓冲区容量，修改时保留最新的记录
+        """
+        if sample_rate is not None:
+            if not 0.0 <= sample_rate <= 1.0:
+                raise ValueError("采样比例必须在0到1之间")
+            self.sample_rate = sample_rate
+        if capacity is not None and capacity != self._profiles.maxlen:
+            self._profiles = deque(self._profiles, maxlen=capacity)
+        self.enabled = enabled
+
+    def turn(self, endpoint: str, conversation_id: Optional[str] = None):
+        """为一轮聊天处理创建剖析上下文。
+
+        Args:
+            endpoint: 请求端点
+            conversation_id: 对话ID
+
+        Returns:
+            上下文管理器；未开启或未被采样时为空上下文
+        """
+        if not self.enabled or random.random() >= self.sample_rate:
+            return _NULL_CONTEXT
+        return self._profile_turn(endpoint, conversation_id)
+
+    @contextlib.contextmanager
+    def _profile_turn(self, endpoint: str, conversation_id: Optional[str]) -> Iterator[None]:
+        if not self._active.acquire(blocking=False):
+            # 已有剖析在进行，本轮不采样
+            yield
+            return
+        record = TurnProfile(next(self._ids), endpoint, conversation_id)
+        token = self._current.set(record)
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+        finally:
+            record.duration_ms = (time.perf_counter() - started) * 1000
+            self._current.reset(token)
+            self._active.release()
+            profile.create_stats()
+            record.stats = profile.stats
+            self._profiles.append(record)
+
+    def stage(self, name: str):
+        """记录当前被采样轮次中某个阶段的耗时。
+
+        Args:
+            name: 阶段名称
+
+        Returns:
+            上下文管理器；当前轮次未被采样时为空上下文
+        """
+        if not self.enabled:
+            return _NULL_CONTEXT
+        record = self._current.get()
+        if record is None:
+            return _NULL_CONTEXT
+        return self._time_stage(record, name)
+
+    @contextlib.contextmanager
+    def _time_stage(self, record: TurnProfile, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            record.stages[name] = record.stages.get(name, 0.0) + elapsed
+
+    def set_conversation(self, conversation_id: str) -> None:
+        """为当前被采样轮次补充对话ID（如新建对话时才生成ID）。
+
+        Args:
+            conversation_id: 对话ID
+        """
+        if self.enabled:
+            record = self._current.get()
+            if record is not None:
+                record.conversation_id = conversation_id
+
+    def profiles(self) -> List[TurnProfile]:
+        """获取缓冲区中的剖析记录，最新的在前。
+
+        Returns:
+            剖析记录列表
+        """
+        return list(reversed(self._profiles))
+
+    def get(self, profile_id: int) -> Optional[TurnProfile]:
+        """按ID获取剖析记录。
+
+        Args:
+            profile_id: 剖析记录ID
+
+        Returns:
+            剖析记录，不存在（或已被淘汰）时返回None
+        """
+        for record in self._profiles:
+            if record.id == profile_id:
+                return record
+        return None
+
+    def clear(self) -> None:
+        """清空剖析记录。"""
+        self._profiles.clear()
+
+
+# 进程级剖析器
+profiler = Profiler()
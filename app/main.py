@@ -4,7 +4,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import RedirectResponse
 
-from app.api import chat
+from app.agents.tools import shutdown_tools
+from app.api import admin, chat
+from app.core.logging_config import setup_logging
+from app.utils.upstream import get_upstream_pool
+from config.deepseek_config import config
+
+# 配置异步结构化日志（重复调用不会重复配置）
+setup_logging(level=config.log_level, fmt=config.log_format, log_prompts=config.log_prompts)
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -24,11 +31,26 @@ app.add_middleware(
 
 # 注册路由
 app.include_router(chat.router)
+app.include_router(admin.router)
 
 # 挂载静态文件
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 
+@app.on_event("startup")
+async def startup():
+    """应用启动时异步探活上游端点，不可用的端点先被摘除。"""
+    if not config.is_local_mode:
+        await get_upstream_pool().acheck()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """应用关闭时释放工具执行池并关闭消息日志。"""
+    shutdown_tools()
+    chat.get_chat_service().close()
+
+
 @app.get("/")
 async def root():
     """API根路径，重定向到聊天界面。"""
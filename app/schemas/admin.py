@@ -0,0 +1,32 @@
+"""管理接口相关的数据模型。"""
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ProfilingConfig(BaseModel):
+    """请求剖析配置模型。"""
+    
+    enabled: bool = Field(..., description="是否开启剖析")
+    sample_rate: Optional[float] = Field(None, ge=0.0, le=1.0, description="采样比例，0到1之间")
+    capacity: Optional[int] = Field(None, ge=1, le=1000, description="保留的剖析记录数")
+
+
+class ProfileSummary(BaseModel):
+    """单次剖析记录摘要模型。"""
+    
+    id: int = Field(..., description="剖析记录ID")
+    endpoint: str = Field(..., description="请求端点")
+    conversation_id: Optional[str] = Field(None, description="对话ID")
+    started_at: float = Field(..., description="开始时间（Unix时间戳）")
+    duration_ms: float = Field(..., description="总耗时（毫秒）")
+    stages: Dict[str, float] = Field(default_factory=dict, description="各阶段耗时（毫秒）")
+
+
+class ProfilingStatus(BaseModel):
+    """请求剖析状态模型。"""
+    
+    enabled: bool = Field(..., description="是否开启剖析")
+    sample_rate: float = Field(..., description="采样比例")
+    capacity: int = Field(..., description="保留的剖析记录数")
+    profiles: List[ProfileSummary] = Field(default_factory=list, description="剖析记录，最新的在前")
@@ -1,4 +1,5 @@
 """聊天相关的数据模型。"""
+import time
 from typing import List, Optional, Any
 
 from pydantic import BaseModel, Field
@@ -9,6 +10,7 @@ class Message(BaseModel):
     
     role: str = Field(..., description="消息发送者角色，如'user'或'assistant'")
     content: str = Field(..., description="消息内容")
+    timestamp: float = Field(default_factory=time.time, description="消息创建时间（Unix时间戳）")
     
 
 class ChatRequest(BaseModel):
@@ -30,4 +32,35 @@ class ConversationHistory(BaseModel):
     """对话历史模型。"""
     
     conversation_id: str = Field(..., description="对话ID")
-    messages: List[Message] = Field(default_factory=list, description="消息历史记录") 
\ No newline at end of file
+    messages: List[Message] = Field(default_factory=list, description="消息历史记录") 
+
+
+class ForkResponse(BaseModel):
+    """对话分支响应模型。"""
+    
+    conversation_id: str = Field(..., description="分支对话ID")
+    parent_id: str = Field(..., description="原对话ID")
+    at: int = Field(..., description="分叉位置，分支包含原对话的前at条消息")
+
+
+class SearchHit(BaseModel):
+    """消息检索命中结果。"""
+    
+    conversation_id: str = Field(..., description="对话ID")
+    message_index: int = Field(..., description="消息在对话中的下标")
+    role: str = Field(..., description="消息发送者角色")
+    timestamp: float = Field(..., description="消息创建时间（Unix时间戳）")
+    score: float = Field(..., description="相关性得分")
+    snippet: str = Field(..., description="命中片段")
+
+
+class SearchResponse(BaseModel):
+    """消息检索响应模型。"""
+    
+    query: str = Field(..., description="查询文本")
+    total: int = Field(..., description="命中总数")
+    total_exact: bool = Field(True, description="命中总数是否精确，常见词项的查询提前终止时为估计值")
+    page: int = Field(..., description="当前页码，从1开始")
+    page_size: int = Field(..., description="每页数量")
+    took_ms: float = Field(..., description="检索耗时（毫秒）")
+    hits: List[SearchHit] = Field(default_factory=list, description="命中结果")
@@ -0,0 +1,98 @@
+"""本地磁盘压缩块存储模块。"""
+import hashlib
+import lzma
+import os
+import zlib
+from typing import Dict, Optional
+
+# 支持的压缩算法：(压缩函数, 解压函数)
+CODECS = {
+    "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (lambda data: lzma.compress(data, preset=1), lzma.decompress),
+}
+
+
+class BlobStore:
+    """按键存取压缩数据块的本地存储。
+
+    每个键对应目录下的一个文件，文件名取键的哈希，避免非法字符。
+    """
+
+    def __init__(self, directory: str, codec: str = "zlib"):
+        """初始化块存储。
+
+        Args:
+            directory: 存储目录，初始化时会清空其中遗留的数据块
+            codec: 压缩算法，"zlib"或"lzma"
+        """
+        if codec not in CODECS:
+            raise ValueError(f"不支持的压缩算法: {codec}")
+        self.directory = directory
+        self.codec = codec
+        self._compress, self._decompress = CODECS[codec]
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(".blob"):
+                os.remove(os.path.join(directory, name))
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.blob")
+
+    def put(self, key: str, data: bytes) -> int:
+        """压缩并写入数据块。
+
+        Args:
+            key: 数据块键
+            data: 原始数据
+
+        Returns:
+            压缩后的字节数
+        """
+        blob = self._compress(data)
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, path)
+        self._total_bytes += len(blob) - self._sizes.get(key, 0)
+        self._sizes[key] = len(blob)
+        return len(blob)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取并解压数据块。
+
+        Args:
+            key: 数据块键
+
+        Returns:
+            原始数据，不存在时返回None
+        """
+        if key not in self._sizes:
+            return None
+        with open(self._path(key), "rb") as f:
+            return self._decompress(f.read())
+
+    def delete(self, key: str) -> None:
+        """删除数据块。
+
+        Args:
+            key: 数据块键
+        """
+        size = self._sizes.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+            os.remove(self._path(key))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._sizes
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    @property
+    def total_bytes(self) -> int:
+        """所有数据块压缩后的总字节数。"""
+        return self._total_bytes
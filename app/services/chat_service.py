@@ -1,56 +1,458 @@
 """聊天服务模块。"""
-from typing import Dict, List, Optional
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from app.schemas.chat import ConversationHistory, Message
+from app.schemas.chat import ConversationHistory, Message, SearchHit, SearchResponse
+from app.services.blob_store import BlobStore
+from app.services.search_index import SearchIndex, tokenize_query
+
+logger = logging.getLogger(__name__)
+
+# 消息日志文件名
+MESSAGE_LOG = "messages.jsonl"
+
+# 检索片段的上下文字符数
+SNIPPET_CONTEXT = 30
+
+# 恢复消息日志时每处理多少条记录转存一次空闲对话
+REPLAY_SPILL_INTERVAL = 1024
+
+
+def _make_snippet(content: str, query: str) -> str:
+    """截取查询词附近的内容片段。
+
+    Args:
+        content: 消息内容
+        query: 查询文本
+
+    Returns:
+        内容片段
+    """
+    lowered = content.lower()
+    positions = [lowered.find(term) for term in tokenize_query(query)]
+    positions = [pos for pos in positions if pos >= 0]
+    if not positions:
+        return content[:SNIPPET_CONTEXT * 2]
+    start = max(min(positions) - SNIPPET_CONTEXT, 0)
+    end = min(start + SNIPPET_CONTEXT * 2 + len(query), len(content))
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(content) else ""
+    return f"{prefix}{content[start:end]}{suffix}"
 
 
 class ChatService:
-    """聊天服务实现。"""
-    
-    def __init__(self):
-        """初始化聊天服务。"""
+    """聊天服务实现。
+
+    启用分层存储后，空闲超过阈值的对话会被压缩转存到本地磁盘，
+    再次访问时透明地加载回内存，使常驻内存随活跃对话数而非总对话数增长。
+
+    对话历史只追加不修改，因此分支对话只记录父对话ID与分叉位置，
+    与父对话共享公共前缀而不复制，自身只保存分叉之后的消息。
+    """
+
+    def __init__(self, data_dir: Optional[str] = None, spill_dir: Optional[str] = None,
+                 idle_seconds: float = 300.0, codec: str = "zlib", spill_batch: int = 16):
+        """初始化聊天服务。
+
+        Args:
+            data_dir: 持久化目录。设置后消息会追加写入日志，
+                重启时从日志恢复对话历史并重建检索索引；为None时仅保存在内存中。
+            spill_dir: 空闲对话的转存目录，为None时不启用分层存储
+            idle_seconds: 对话空闲多久后转存到磁盘（秒）
+            codec: 转存使用的压缩算法，"zlib"或"lzma"
+            spill_batch: 写入路径上每次最多转存的对话数，限制单次写入的停顿时间
+        """
         # 简单的内存存储，生产环境应使用数据库
         self._conversations: Dict[str, ConversationHistory] = {}
-        
+        self._index = SearchIndex()
+        self._log = None
+        self._blobs = BlobStore(spill_dir, codec) if spill_dir else None
+        self._idle_seconds = idle_seconds
+        self._spill_batch = spill_batch
+        self._next_spill = 0.0
+        # 按最近访问顺序排列，最久未访问的对话在最前面
+        self._last_access: "OrderedDict[str, float]" = OrderedDict()
+        self._raw_bytes: Dict[str, int] = {}
+        self._resident_bytes = 0
+        self._spill_listeners: List[Callable[[List[str]], None]] = []
+        # 分支对话 -> (父对话ID, 分叉位置)，分支包含父对话的前“分叉位置”条消息
+        self._parents: Dict[str, Tuple[str, int]] = {}
+        # 检索在线程池中执行，与事件循环中的读写互斥
+        self._lock = threading.RLock()
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+            log_path = os.path.join(data_dir, MESSAGE_LOG)
+            self._replay(log_path)
+            self._log = open(log_path, "a", encoding="utf-8")
+        self.spill_idle()
+
+    def _replay(self, log_path: str) -> None:
+        """从消息日志恢复对话历史与检索索引。
+
+        恢复过程中按日志时间定期转存已空闲的对话，使重启时的内存峰值
+        同样随活跃对话数而非总对话数增长。
+
+        Args:
+            log_path: 消息日志路径
+        """
+        if not os.path.exists(log_path):
+            return
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程崩溃时最后一行可能不完整
+                    logger.warning("跳过损坏的消息日志记录: %s:%d", log_path, line_no)
+                    continue
+                if line_no % REPLAY_SPILL_INTERVAL == 0:
+                    # 以日志中的时间判断空闲，之后仍会写入的对话不会被反复转存
+                    self.spill_idle(now=record["timestamp"])
+                if record.get("type") == "fork":
+                    self._fork(
+                        record["parent_id"],
+                        record["conversation_id"],
+                        record["at"],
+                        accessed_at=record["timestamp"]
+                    )
+                    continue
+                self._append(
+                    record["conversation_id"],
+                    Message(
+                        role=record["role"],
+                        content=record["content"],
+                        timestamp=record["timestamp"]
+                    ),
+                    accessed_at=record["timestamp"]
+                )
+
+    def _append(self, conversation_id: str, message: Message, accessed_at: float) -> None:
+        """将消息加入内存存储并更新检索索引。"""
+        history = self._load(conversation_id, accessed_at=accessed_at)
+        if history is None:
+            history = self._conversations[conversation_id] = ConversationHistory(
+                conversation_id=conversation_id,
+                messages=[]
+            )
+            self._touch(conversation_id, accessed_at)
+        self._index.add(
+            conversation_id=conversation_id,
+            position=self._base(conversation_id) + len(history.messages),
+            role=message.role,
+            timestamp=message.timestamp,
+            content=message.content
+        )
+        history.messages.append(message)
+        size = len(message.content.encode("utf-8"))
+        self._raw_bytes[conversation_id] = self._raw_bytes.get(conversation_id, 0) + size
+        self._resident_bytes += size
+
+    def _base(self, conversation_id: str) -> int:
+        """获取对话自身第一条消息在完整历史中的下标（即从父对话继承的消息数）。"""
+        parent = self._parents.get(conversation_id)
+        return parent[1] if parent else 0
+
+    def _fork(self, parent_id: str, conversation_id: str, at: int, accessed_at: float) -> None:
+        """创建分支对话，只记录父对话与分叉位置，不复制消息。"""
+        self._parents[conversation_id] = (parent_id, at)
+        self._conversations[conversation_id] = ConversationHistory(
+            conversation_id=conversation_id,
+            messages=[]
+        )
+        self._touch(conversation_id, accessed_at)
+
+    def _materialize(self, conversation_id: str, promote: bool = True) -> Optional[List[Message]]:
+        """沿分支链拼接对话的完整消息列表。
+
+        Args:
+            conversation_id: 对话ID
+            promote: 是否将转存的对话（含祖先对话）加载回内存
+
+        Returns:
+            完整消息列表，如果对话不存在则返回None。非分支对话直接返回存储的列表。
+        """
+        history = self._load(conversation_id, promote=promote)
+        if history is None or conversation_id not in self._parents:
+            return history.messages if history is not None else None
+
+        segments = [history.messages]
+        parent_id, end = self._parents[conversation_id]
+        while True:
+            parent = self._load(parent_id, promote=promote)
+            base = self._base(parent_id)
+            segments.append(parent.messages[:max(end - base, 0)])
+            if parent_id not in self._parents:
+                break
+            parent_id, end = self._parents[parent_id][0], min(end, base)
+        return [message for segment in reversed(segments) for message in segment]
+
+    def _load(self, conversation_id: str, promote: bool = True,
+              accessed_at: Optional[float] = None) -> Optional[ConversationHistory]:
+        """获取对话，必要时从磁盘转存中恢复。
+
+        Args:
+            conversation_id: 对话ID
+            promote: 是否将转存的对话加载回内存并刷新访问时间；
+                为False时只临时解压读取，不影响分层状态
+            accessed_at: 访问时间，默认为当前时间
+
+        Returns:
+            对话历史记录，如果不存在则返回None
+        """
+        history = self._conversations.get(conversation_id)
+        if history is None and self._blobs is not None and conversation_id in self._blobs:
+            records = json.loads(self._blobs.get(conversation_id))
+            history = ConversationHistory.model_construct(
+                conversation_id=conversation_id,
+                messages=[
+                    Message.model_construct(role=role, content=content, timestamp=timestamp)
+                    for role, content, timestamp in records
+                ]
+            )
+            if promote:
+                self._blobs.delete(conversation_id)
+                self._conversations[conversation_id] = history
+                self._resident_bytes += self._raw_bytes.get(conversation_id, 0)
+        if history is not None and promote:
+            self._touch(conversation_id, accessed_at or time.time())
+        return history
+
+    def _touch(self, conversation_id: str, accessed_at: float) -> None:
+        """记录对话的访问时间并移到访问顺序末尾。"""
+        self._last_access[conversation_id] = accessed_at
+        self._last_access.move_to_end(conversation_id)
+
+    def spill_idle(self, now: Optional[float] = None, limit: Optional[int] = None) -> List[str]:
+        """将空闲对话压缩转存到磁盘。
+
+        按访问顺序从最久未访问的对话开始检查，遇到未空闲的对话即停止，
+        因此检查开销与转存的对话数成正比，而不是与对话总数成正比。
+
+        Args:
+            now: 当前时间戳，默认为当前时间
+            limit: 最多转存的对话数，为None时转存全部空闲对话
+
+        Returns:
+            本次转存的对话ID列表
+        """
+        with self._lock:
+            if self._blobs is None:
+                return []
+            now = now or time.time()
+            idle = []
+            for conversation_id, accessed_at in self._last_access.items():
+                if now - accessed_at < self._idle_seconds or (limit is not None and len(idle) >= limit):
+                    break
+                idle.append(conversation_id)
+            for conversation_id in idle:
+                history = self._conversations.pop(conversation_id)
+                del self._last_access[conversation_id]
+                payload = json.dumps(
+                    [[m.role, m.content, m.timestamp] for m in history.messages],
+                    ensure_ascii=False
+                ).encode("utf-8")
+                self._blobs.put(conversation_id, payload)
+                self._resident_bytes -= self._raw_bytes.get(conversation_id, 0)
+            if idle:
+                for listener in self._spill_listeners:
+                    listener(idle)
+            return idle
+
+    def _maybe_spill(self, now: float) -> None:
+        """按固定间隔转存空闲对话。
+
+        写入路径上每次最多转存 ``spill_batch`` 个对话；还有剩余时由之后的写入继续，
+        把转存开销分摊到多次写入，避免某一次写入因空闲对话过多而长时间停顿。
+        """
+        if self._blobs is None or now < self._next_spill:
+            return
+        spilled = self.spill_idle(now, limit=self._spill_batch)
+        if len(spilled) < self._spill_batch:
+            self._next_spill = now + max(self._idle_seconds / 4, 1.0)
+
+    def add_spill_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """注册对话转存回调，用于同步释放与这些对话关联的其他内存状态。
+
+        Args:
+            listener: 回调函数，参数为被转存的对话ID列表
+        """
+        self._spill_listeners.append(listener)
+
     def save_message(self, conversation_id: str, role: str, content: str) -> None:
         """保存聊天消息。
-        
+
         Args:
             conversation_id: 对话ID
             role: 消息发送者角色
             content: 消息内容
         """
-        if conversation_id not in self._conversations:
-            self._conversations[conversation_id] = ConversationHistory(
-                conversation_id=conversation_id,
-                messages=[]
-            )
-            
-        self._conversations[conversation_id].messages.append(
-            Message(role=role, content=content)
-        )
-        
+        with self._lock:
+            message = Message(role=role, content=content)
+            if self._log is not None:
+                self._log.write(json.dumps({
+                    "conversation_id": conversation_id,
+                    "role": role,
+                    "content": content,
+                    "timestamp": message.timestamp
+                }, ensure_ascii=False) + "\n")
+                self._log.flush()
+            self._append(conversation_id, message, accessed_at=message.timestamp)
+            self._maybe_spill(message.timestamp)
+
+    def fork_conversation(self, conversation_id: str, new_conversation_id: str,
+                          at: Optional[int] = None) -> Optional[int]:
+        """从对话的某个位置创建分支对话。
+
+        分支与原对话共享前缀，创建的时间和内存开销与历史长度无关。
+
+        Args:
+            conversation_id: 原对话ID
+            new_conversation_id: 分支对话ID
+            at: 分叉位置，分支包含原对话的前 ``at`` 条消息，默认为全部消息
+
+        Returns:
+            分叉位置，如果原对话不存在则返回None
+
+        Raises:
+            ValueError: 分叉位置超出范围或分支对话ID已存在
+        """
+        with self._lock:
+            history = self._load(conversation_id)
+            if history is None:
+                return None
+            length = self._base(conversation_id) + len(history.messages)
+            if at is None:
+                at = length
+            if not 0 <= at <= length:
+                raise ValueError(f"分叉位置超出范围: {at}（对话共有{length}条消息）")
+            if new_conversation_id in self._conversations or (
+                    self._blobs is not None and new_conversation_id in self._blobs):
+                raise ValueError(f"对话已存在: {new_conversation_id}")
+
+            now = time.time()
+            if self._log is not None:
+                self._log.write(json.dumps({
+                    "type": "fork",
+                    "conversation_id": new_conversation_id,
+                    "parent_id": conversation_id,
+                    "at": at,
+                    "timestamp": now
+                }, ensure_ascii=False) + "\n")
+                self._log.flush()
+            self._fork(conversation_id, new_conversation_id, at, accessed_at=now)
+            self._maybe_spill(now)
+            return at
+
     def get_conversation_history(self, conversation_id: str) -> Optional[ConversationHistory]:
         """获取对话历史。
-        
+
         Args:
             conversation_id: 对话ID
-            
+
         Returns:
             对话历史记录，如果不存在则返回None
         """
-        return self._conversations.get(conversation_id)
-        
+        with self._lock:
+            if conversation_id not in self._parents:
+                return self._load(conversation_id)
+            messages = self._materialize(conversation_id)
+            if messages is None:
+                return None
+            return ConversationHistory.model_construct(conversation_id=conversation_id, messages=messages)
+
     def get_messages(self, conversation_id: str) -> List[Message]:
         """获取对话中的所有消息。
-        
+
         Args:
             conversation_id: 对话ID
-            
+
         Returns:
             消息列表
         """
-        if conversation_id not in self._conversations:
-            return []
-            
-        return self._conversations[conversation_id].messages
+        with self._lock:
+            return self._materialize(conversation_id) or []
+
+    def storage_stats(self) -> Dict[str, Any]:
+        """获取分层存储统计。
+
+        Returns:
+            常驻内存与转存到磁盘的对话数和字节数。
+            ``resident_bytes``与``spilled_raw_bytes``为消息内容的原始字节数，
+            ``spilled_bytes``为压缩后占用的磁盘字节数。
+        """
+        with self._lock:
+            total_raw = sum(self._raw_bytes.values())
+            return {
+                "resident_conversations": len(self._conversations),
+                "spilled_conversations": len(self._blobs) if self._blobs is not None else 0,
+                "resident_bytes": self._resident_bytes,
+                "spilled_raw_bytes": total_raw - self._resident_bytes,
+                "spilled_bytes": self._blobs.total_bytes if self._blobs is not None else 0,
+                "codec": self._blobs.codec if self._blobs is not None else None,
+                "idle_seconds": self._idle_seconds,
+            }
+
+    def search(self, query: str, role: Optional[str] = None,
+               start_time: Optional[float] = None, end_time: Optional[float] = None,
+               page: int = 1, page_size: int = 20) -> SearchResponse:
+        """全文检索历史消息。
+
+        Args:
+            query: 查询文本，多个词项之间为“与”关系
+            role: 只返回该角色的消息
+            start_time: 最早时间戳（含）
+            end_time: 最晚时间戳（含）
+            page: 页码，从1开始
+            page_size: 每页数量
+
+        Returns:
+            按相关性排序的检索结果
+        """
+        started = time.perf_counter()
+        with self._lock:
+            total, total_exact, ranked = self._index.search(
+                query,
+                role=role,
+                start_time=start_time,
+                end_time=end_time,
+                offset=(page - 1) * page_size,
+                limit=page_size
+            )
+            # 同一对话的多条命中只读取一次，已转存的对话只解压一次
+            histories: Dict[str, ConversationHistory] = {}
+            hits = []
+            for doc_id, score in ranked:
+                conversation_id, position, doc_role, timestamp = self._index.document(doc_id)
+                history = histories.get(conversation_id)
+                if history is None:
+                    # 检索不应把已转存的对话加载回内存
+                    history = histories[conversation_id] = self._load(conversation_id, promote=False)
+                content = history.messages[position - self._base(conversation_id)].content
+                hits.append(SearchHit(
+                    conversation_id=conversation_id,
+                    message_index=position,
+                    role=doc_role,
+                    timestamp=timestamp,
+                    score=round(score, 4),
+                    snippet=_make_snippet(content, query)
+                ))
+        return SearchResponse(
+            query=query,
+            total=total,
+            total_exact=total_exact,
+            page=page,
+            page_size=page_size,
+            took_ms=round((time.perf_counter() - started) * 1000, 3),
+            hits=hits
+        )
+
+    def close(self) -> None:
+        """关闭消息日志。"""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
@@ -0,0 +1,101 @@
+"""请求幂等模块。
+
+客户端在超时后重试时携带相同的幂等键，服务端保证同一个键只执行一次：
+
+- 执行中的重复请求挂到同一个待完成的任务上（single-flight）；
+- 成功完成的结果在有界的TTL存储中保留一段时间，重试时直接返回，
+  失败的结果不保留，重试时重新执行；
+- 同一个键携带不同的请求内容时视为冲突。
+
+执行在独立的任务中进行，首个请求的客户端断开不会取消执行，
+重试的请求仍可拿到结果。存储绑定在单个事件循环上使用。
+"""
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from app.utils.ttl_cache import MISSING, TTLCache
+
+
+class IdempotencyConflictError(Exception):
+    """同一个幂等键携带了不同的请求内容。"""
+
+
+def request_fingerprint(payload: Dict[str, Any]) -> str:
+    """计算请求内容的指纹。
+
+    Args:
+        payload: 请求内容
+
+    Returns:
+        请求内容的SHA-256摘要
+    """
+    data = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """幂等键存储，合并执行中的重复请求并缓存已完成的结果。"""
+
+    def __init__(self, ttl: float = 86400.0, maxsize: int = 10000):
+        """初始化幂等键存储。
+
+        Args:
+            ttl: 已完成结果的保留时间（秒）
+            maxsize: 最多保留结果的幂等键数量
+        """
+        self._completed = TTLCache(ttl, maxsize)
+        self._inflight: Dict[str, Tuple[str, "asyncio.Task"]] = {}
+
+    async def run(self, key: str, fingerprint: str,
+                  func: Callable[[], Awaitable[Tuple[Any, bool]]]) -> Tuple[Any, bool]:
+        """按幂等键执行请求。
+
+        执行失败（返回失败或抛出异常）的结果不会保留，之后的重试会重新执行；
+        执行期间到达的重复请求仍共享同一次执行的结果。
+
+        Args:
+            key: 幂等键
+            fingerprint: 请求内容指纹
+            func: 实际执行请求的协程函数，返回(执行结果, 是否成功)
+
+        Returns:
+            (执行结果, 是否为重放的结果)
+
+        Raises:
+            IdempotencyConflictError: 幂等键已用于不同的请求内容
+        """
+        cached = self._completed.get(key)
+        if cached is not MISSING:
+            self._check(key, fingerprint, cached[0])
+            return cached[1], True
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._check(key, fingerprint, inflight[0])
+            value, _ = await asyncio.shield(inflight[1])
+            return value, True
+
+        task = asyncio.get_running_loop().create_task(func())
+        self._inflight[key] = (fingerprint, task)
+        task.add_done_callback(lambda done: self._finish(key, fingerprint, done))
+        value, _ = await asyncio.shield(task)
+        return value, False
+
+    def _finish(self, key: str, fingerprint: str, task: "asyncio.Task") -> None:
+        """任务完成后移出执行中列表，成功的结果转入TTL存储。"""
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        value, succeeded = task.result()
+        if succeeded:
+            self._completed.set(key, (fingerprint, value))
+
+    @staticmethod
+    def _check(key: str, fingerprint: str, expected: str) -> None:
+        if fingerprint != expected:
+            raise IdempotencyConflictError(f"幂等键 {key} 已用于不同的请求内容")
+
+    def __len__(self) -> int:
+        return len(self._completed) + len(self._inflight)
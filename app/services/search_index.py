@@ -0,0 +1,343 @@
+"""对话消息倒排索引模块。
+
+中文文本按单字和相邻双字（bigram）切分，英文与数字按单词切分并转为小写，
+无需额外的分词依赖。倒排表和文档元数据使用紧凑的 ``array`` 存储，
+查询时从最短的倒排表开始求交集并按BM25打分。
+
+较长的倒排表另外按影响力（词频与文档长度）分组。查询时按得分上界从高到低
+处理各组，前k名的最低分已高于剩余分组的上界时提前终止（MaxScore），
+因此常见词项的查询只需检查少量候选文档，命中总数此时为估计值。
+"""
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+# 连续的中日韩文字，或连续的字母数字
+_TOKEN_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[0-9a-zA-Z_]+")
+_CJK_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+
+# BM25参数
+_K1 = 1.2
+_B = 0.75
+
+# 倒排表达到该长度后维护按影响力分组的倒排表
+IMPACT_MIN_POSTINGS = 1024
+
+# 影响力分组的词频上限，更高的词频归入同一组
+_TF_CAP = 8
+
+# 单次查询最多检查的候选文档数
+MAX_CANDIDATES = 10000
+
+
+def _is_cjk(run: str) -> bool:
+    return bool(_CJK_PATTERN.match(run))
+
+
+def tokenize(text: str) -> List[str]:
+    """将文本切分为索引词项。
+
+    中文片段同时产生单字与双字词项，保证单字查询与多字查询都能命中。
+
+    Args:
+        text: 待切分文本
+
+    Returns:
+        词项列表（可能重复）
+    """
+    tokens: List[str] = []
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if _is_cjk(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def tokenize_query(text: str) -> List[str]:
+    """将查询切分为词项。
+
+    长度大于1的中文片段只使用双字词项，选择性更好。
+
+    Args:
+        text: 查询文本
+
+    Returns:
+        去重后的词项列表
+    """
+    tokens: List[str] = []
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if _is_cjk(run) and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return list(dict.fromkeys(tokens))
+
+
+def _length_class(length: int) -> int:
+    """文档长度分级：32以内每个长度一级，更长的文档每四分之一个倍程一级。"""
+    if length <= 32:
+        return length
+    return 32 + int(math.log2(length / 32) * 4)
+
+
+def _class_min_length(length_class: int) -> float:
+    """获取长度等级内文档长度的下界。"""
+    if length_class <= 32:
+        return length_class
+    return 32 * 2 ** ((length_class - 32) / 4)
+
+
+class SearchIndex:
+    """基于倒排表的消息全文索引。
+
+    文档编号按写入顺序递增，因此每个倒排表天然有序，可直接二分查找。
+    """
+
+    def __init__(self, impact_min_postings: int = IMPACT_MIN_POSTINGS,
+                 max_candidates: int = MAX_CANDIDATES):
+        """初始化空索引。
+
+        Args:
+            impact_min_postings: 倒排表达到该长度后维护影响力分组，用于查询提前终止
+            max_candidates: 单次查询最多检查的候选文档数。超出时按得分上界较高的
+                分组返回近似结果，命中总数为估计值
+        """
+        self._impact_min_postings = impact_min_postings
+        self._max_candidates = max_candidates
+        self._postings: Dict[str, array] = {}
+        self._freqs: Dict[str, array] = {}
+        # 词项 -> {词频等级 << 8 | 文档长度等级: 文档编号}，只为长倒排表维护
+        self._impacts: Dict[str, Dict[int, array]] = {}
+        self._conversation_ids: List[str] = []
+        self._conversation_codes: Dict[str, int] = {}
+        self._roles: List[str] = []
+        self._role_codes: Dict[str, int] = {}
+        self._doc_conversation = array("I")
+        self._doc_position = array("I")
+        self._doc_role = array("B")
+        self._doc_time = array("d")
+        self._doc_length = array("I")
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_length)
+
+    def _code(self, value: str, values: List[str], codes: Dict[str, int]) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def add(self, conversation_id: str, position: int, role: str,
+            timestamp: float, content: str) -> int:
+        """索引一条消息。
+
+        Args:
+            conversation_id: 对话ID
+            position: 消息在对话中的下标
+            role: 消息发送者角色
+            timestamp: 消息时间戳
+            content: 消息内容
+
+        Returns:
+            文档编号
+        """
+        doc_id = len(self._doc_length)
+        tokens = tokenize(content)
+        self._doc_conversation.append(
+            self._code(conversation_id, self._conversation_ids, self._conversation_codes)
+        )
+        self._doc_position.append(position)
+        self._doc_role.append(self._code(role, self._roles, self._role_codes))
+        self._doc_time.append(timestamp)
+        self._doc_length.append(len(tokens))
+        self._total_length += len(tokens)
+
+        length_class = _length_class(len(tokens))
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = array("I")
+                self._freqs[token] = array("H")
+            count = min(count, 0xFFFF)
+            postings.append(doc_id)
+            self._freqs[token].append(count)
+            buckets = self._impacts.get(token)
+            if buckets is not None:
+                key = (count if count < _TF_CAP else _TF_CAP) << 8 | length_class
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = array("I")
+                bucket.append(doc_id)
+            elif len(postings) >= self._impact_min_postings:
+                self._build_impacts(token)
+        return doc_id
+
+    def _build_impacts(self, term: str) -> None:
+        """倒排表首次达到阈值时为其建立影响力分组。"""
+        buckets = self._impacts[term] = {}
+        for doc_id, tf in zip(self._postings[term], self._freqs[term]):
+            key = min(tf, _TF_CAP) << 8 | _length_class(self._doc_length[doc_id])
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = array("I")
+            bucket.append(doc_id)
+
+    def document(self, doc_id: int) -> Tuple[str, int, str, float]:
+        """获取文档元数据。
+
+        Args:
+            doc_id: 文档编号
+
+        Returns:
+            (对话ID, 消息下标, 角色, 时间戳)
+        """
+        return (
+            self._conversation_ids[self._doc_conversation[doc_id]],
+            self._doc_position[doc_id],
+            self._roles[self._doc_role[doc_id]],
+            self._doc_time[doc_id],
+        )
+
+    def _bound(self, idf: float, tf: float, length: float, avg_length: float) -> float:
+        """计算词项在给定词频与文档长度下的BM25得分，词频为无穷大时取饱和值。"""
+        if tf == math.inf:
+            return idf * (_K1 + 1)
+        norm = _K1 * (1 - _B + _B * length / avg_length)
+        return idf * tf * (_K1 + 1) / (tf + norm)
+
+    def _max_tf(self, term: str) -> float:
+        """获取词项在所有文档中的最大词频，词频达到分组上限时视为无穷大。"""
+        buckets = self._impacts.get(term)
+        if buckets is None:
+            return max(self._freqs[term])
+        tf = max(key >> 8 for key in buckets)
+        return tf if tf < _TF_CAP else math.inf
+
+    def _bucket_bound(self, key: int, idf: float, rest: List[Tuple[float, float]],
+                      avg_length: float) -> float:
+        """计算首个词项某个影响力分组内文档的得分上界。
+
+        组内文档都不短于该组的长度下界，其余词项的得分同样以该长度为上界。
+        """
+        tf = key >> 8
+        length = _class_min_length(key & 0xFF)
+        return sum(
+            self._bound(term_idf, term_tf, length, avg_length)
+            for term_idf, term_tf in [(idf, tf if tf < _TF_CAP else math.inf)] + rest
+        )
+
+    def search(self, query: str, role: Optional[str] = None,
+               start_time: Optional[float] = None, end_time: Optional[float] = None,
+               offset: int = 0, limit: int = 20) -> Tuple[int, bool, List[Tuple[int, float]]]:
+        """检索包含全部查询词项的消息。
+
+        Args:
+            query: 查询文本
+            role: 只返回该角色的消息
+            start_time: 最早时间戳（含）
+            end_time: 最晚时间戳（含）
+            offset: 结果偏移量
+            limit: 返回数量
+
+        Returns:
+            (命中总数, 命中总数是否精确, [(文档编号, 得分)])，按得分降序、新消息优先。
+            提前终止时命中总数按已检查候选中的命中比例估计
+        """
+        terms = tokenize_query(query)
+        if not terms or not self._doc_length:
+            return 0, True, []
+        if any(term not in self._postings for term in terms):
+            return 0, True, []
+        role_code = None
+        if role is not None:
+            role_code = self._role_codes.get(role)
+            if role_code is None:
+                return 0, True, []
+
+        terms.sort(key=lambda term: len(self._postings[term]))
+        doc_count = len(self._doc_length)
+        avg_length = self._total_length / doc_count or 1.0
+        idf = {
+            term: math.log(1 + (doc_count - len(self._postings[term]) + 0.5)
+                           / (len(self._postings[term]) + 0.5))
+            for term in terms
+        }
+
+        lead, rest = terms[0], terms[1:]
+        lead_postings = self._postings[lead]
+        buckets = self._impacts.get(lead)
+        if buckets is None:
+            # 短倒排表直接全部检查，得分上界为无穷大
+            groups = [(math.inf, lead_postings, None)]
+        else:
+            rest_tf = [(idf[term], self._max_tf(term)) for term in rest]
+            groups = sorted(
+                ((self._bucket_bound(key, idf[lead], rest_tf, avg_length), docs,
+                  key >> 8 if key >> 8 < _TF_CAP else None)
+                 for key, docs in buckets.items()),
+                key=lambda group: group[0],
+                reverse=True
+            )
+
+        total = 0
+        scanned = 0
+        exhausted = True
+        top: List[Tuple[float, int]] = []
+        keep = offset + limit
+        for bound, docs, lead_tf in groups:
+            # 剩余分组的得分上界均低于当前第k名，不可能再进入结果
+            if len(top) >= keep and bound < top[0][0] - 1e-9:
+                exhausted = False
+                break
+            if scanned + len(docs) > self._max_candidates:
+                # 超出单次查询的检查预算，只检查该组中较新的文档
+                docs = docs[len(docs) - (self._max_candidates - scanned):]
+                exhausted = False
+            scanned += len(docs)
+            # 分组的词频等级即首个词项的词频，达到上限的分组需查倒排表
+            check = rest if lead_tf is not None else terms
+            for doc_id in docs:
+                if role_code is not None and self._doc_role[doc_id] != role_code:
+                    continue
+                timestamp = self._doc_time[doc_id]
+                if start_time is not None and timestamp < start_time:
+                    continue
+                if end_time is not None and timestamp > end_time:
+                    continue
+
+                matched = [(lead, lead_tf)] if lead_tf is not None else []
+                for term in check:
+                    postings = self._postings[term]
+                    j = bisect_left(postings, doc_id)
+                    if j == len(postings) or postings[j] != doc_id:
+                        break
+                    matched.append((term, self._freqs[term][j]))
+                else:
+                    total += 1
+                    length = self._doc_length[doc_id]
+                    score = sum(self._bound(idf[term], tf, length, avg_length) for term, tf in matched)
+                    item = (score, doc_id)
+                    if len(top) < keep:
+                        heapq.heappush(top, item)
+                    elif keep and item > top[0]:
+                        heapq.heapreplace(top, item)
+            if not exhausted:
+                break
+
+        ranked = sorted(top, reverse=True)[offset:offset + limit]
+        results = [(doc_id, score) for score, doc_id in ranked]
+        if exhausted:
+            return total, True, results
+        if not rest and role_code is None and start_time is None and end_time is None:
+            return len(lead_postings), True, results
+        return max(round(total * len(lead_postings) / max(scanned, 1)), total), False, results
@@ -1,5 +1,5 @@
 """Utility functions for LLM operations."""
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 import logging
 
 from langchain.base_language import BaseLanguageModel
@@ -7,8 +7,14 @@ from langchain_deepseek import ChatDeepSeek
 from pydantic import SecretStr
 import httpx
 
+from app.utils.upstream import AsyncPoolTransport, PoolTransport, VIRTUAL_BASE_URL, get_upstream_pool
 from config.deepseek_config import config
 
+logger = logging.getLogger(__name__)
+
+# 经端点池路由的共享HTTP客户端，所有语言模型实例复用
+_pooled_clients: Optional[Tuple[httpx.Client, httpx.AsyncClient]] = None
+
 def check_api_key(api_key: Union[str, SecretStr], base_url: str = "https://api.deepseek.com/v1") -> bool:
     """检查API密钥是否有效。
     
@@ -33,39 +39,73 @@ def check_api_key(api_key: Union[str, SecretStr], base_url: str = "https://api.d
         # 检查响应状态
         return response.status_code == 200
     except Exception as e:
-        logging.warning(f"API密钥检查失败: {str(e)}")
+        logger.warning("API密钥检查失败: %s", e)
         return False
 
 def create_llm(model_name: str = "deepseek-chat",
               temperature: float = 0.7,
-              api_key: Optional[Union[str, SecretStr]] = None) -> BaseLanguageModel:
+              api_key: Optional[Union[str, SecretStr]] = None,
+              max_tokens: Optional[int] = None) -> BaseLanguageModel:
     """创建语言模型实例。
 
     Args:
         model_name: 使用的模型名称。
         temperature: 生成响应时的温度参数。
         api_key: DeepSeek API密钥。
+        max_tokens: 最大生成token数，默认使用模型配置。
 
     Returns:
         语言模型实例。
     """
     model_config = get_model_config(model_name)
     
+    if api_key is None:
+        # 未指定密钥时经端点池访问上游
+        http_client, http_async_client = _get_pooled_clients()
+        return ChatDeepSeek(
+            model=model_name,
+            temperature=temperature,
+            max_tokens=max_tokens or model_config.get("max_tokens", 1000),
+            # 占位密钥，实际密钥由端点池按所选端点替换
+            api_key=SecretStr("upstream-pool"),
+            base_url=VIRTUAL_BASE_URL,
+            http_client=http_client,
+            http_async_client=http_async_client
+        )
+    
     # 确定API密钥
-    final_api_key = (SecretStr(api_key) if isinstance(api_key, str) else api_key) or config.api_key
+    final_api_key = SecretStr(api_key) if isinstance(api_key, str) else api_key
     
     # 检查API密钥是否有效
     if not check_api_key(final_api_key, config.base_url):
-        logging.warning("DeepSeek API密钥无效或API服务不可用，请检查配置")
+        logger.warning("DeepSeek API密钥无效或API服务不可用，请检查配置")
     
     return ChatDeepSeek(
         model=model_name,
         temperature=temperature,
-        max_tokens=model_config.get("max_tokens", 1000),
+        max_tokens=max_tokens or model_config.get("max_tokens", 1000),
         api_key=final_api_key,
         base_url=config.base_url
     )
 
+def _get_pooled_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """获取（首次调用时创建）经端点池路由的共享HTTP客户端。
+
+    创建时不做同步探活（首次创建发生在请求处理路径上），端点的可用性由
+    服务启动时的 ``EndpointPool.acheck`` 以及请求失败时的被动摘除保证。
+
+    Returns:
+        (同步客户端, 异步客户端)
+    """
+    global _pooled_clients
+    if _pooled_clients is None:
+        pool = get_upstream_pool()
+        _pooled_clients = (
+            httpx.Client(transport=PoolTransport(pool), timeout=None),
+            httpx.AsyncClient(transport=AsyncPoolTransport(pool), timeout=None)
+        )
+    return _pooled_clients
+
 def get_model_config(model_name: str) -> dict:
     """获取特定模型的配置。
 
@@ -79,7 +119,34 @@ def get_model_config(model_name: str) -> dict:
         "deepseek-chat": {
             "max_tokens": 4096,
             "default_temperature": 0.7,
-            "supports_functions": True
+            "supports_functions": True,
+            # 闲聊类消息的回复通常很短，限制生成长度以降低延迟
+            "route_max_tokens": {
+                "simple": 1024
+            }
         }
     }
-    return configs.get(model_name, {}) 
\ No newline at end of file
+    return configs.get(model_name, {}) 
+
+def get_route_config(route: str) -> dict:
+    """获取模型路由的配置。
+
+    模型名称与最大token数可通过环境变量 ``ROUTE_<路由>_MODEL`` 和
+    ``ROUTE_<路由>_MAX_TOKENS`` 配置，最大token数不会超过模型本身的上限。
+
+    Args:
+        route: 路由名称，如"simple"或"agent"。
+
+    Returns:
+        包含model_name和max_tokens的字典。
+    """
+    model_name = config.route_model(route)
+    model_config = get_model_config(model_name)
+    model_max_tokens = model_config.get("max_tokens", 1000)
+    max_tokens = config.route_max_tokens(route) or model_config.get(
+        "route_max_tokens", {}
+    ).get(route, model_max_tokens)
+    return {
+        "model_name": model_name,
+        "max_tokens": min(max_tokens, model_max_tokens)
+    }
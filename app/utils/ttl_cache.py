@@ -0,0 +1,48 @@
+"""带过期时间的有界LRU缓存模块。"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Tuple
+
+# TTLCache未命中时返回的哨兵值
+MISSING = object()
+
+
+class TTLCache:
+    """带过期时间的有界LRU缓存。"""
+
+    def __init__(self, ttl: float, maxsize: int = 256):
+        """初始化缓存。
+
+        Args:
+            ttl: 条目存活时间（秒）
+            maxsize: 最大条目数
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """读取缓存条目，不存在或已过期时返回哨兵值。"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return MISSING
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """写入缓存条目。"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
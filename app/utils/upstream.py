@@ -0,0 +1,384 @@
+"""上游LLM端点池模块。
+
+将多个API密钥与基础URL（DeepSeek官方接口、OpenAI兼容镜像或自建网关）
+组成端点池，通过自定义的httpx传输层在每次请求时选择端点：
+
+- 选择策略：最少未完成请求数，或按EWMA延迟加权；
+- 返回429/5xx（以及401/403、连接错误）的端点会被摘除，摘除时间指数退避；
+- 摘除到期后在后台请求 ``/models`` 探活，成功后重新加入。
+
+LLM客户端使用虚拟基础URL ``VIRTUAL_BASE_URL``，传输层会把请求改写到
+所选端点的基础URL，并替换为该端点的API密钥。
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from config.deepseek_config import config
+
+logger = logging.getLogger(__name__)
+
+# LLM客户端使用的虚拟基础URL，请求会被改写到实际端点
+VIRTUAL_BASE_URL = "http://upstream.pool"
+
+# 选择策略
+STRATEGY_LEAST_OUTSTANDING = "least_outstanding"
+STRATEGY_EWMA = "ewma"
+
+# 端点状态
+STATE_HEALTHY = "healthy"
+STATE_EJECTED = "ejected"
+STATE_PROBING = "probing"
+
+# 需要摘除端点的状态码：限流、服务端错误，以及密钥失效
+_EJECT_STATUS = {401, 403, 429}
+
+
+def _should_eject(status_code: int) -> bool:
+    return status_code in _EJECT_STATUS or status_code >= 500
+
+
+class Endpoint:
+    """上游端点及其运行状态。"""
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, name: Optional[str] = None):
+        """初始化端点。
+
+        Args:
+            base_url: 基础URL，如 ``https://api.deepseek.com/v1``
+            api_key: API密钥
+            name: 端点名称，默认由基础URL与密钥后缀生成
+        """
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        suffix = f"#{api_key[-4:]}" if api_key else ""
+        self.name = name or f"{self.base_url}{suffix}"
+        self.state = STATE_HEALTHY
+        self.outstanding = 0
+        self.ewma_ms: Optional[float] = None
+        self.requests = 0
+        self.errors = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.backoff = 0.0
+        self.last_status: Optional[int] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """导出端点统计（不含密钥）。
+
+        Returns:
+            端点统计字典
+        """
+        return {
+            "name": self.name,
+            "base_url": self.base_url,
+            "state": self.state,
+            "outstanding": self.outstanding,
+            "ewma_latency_ms": round(self.ewma_ms, 3) if self.ewma_ms is not None else None,
+            "requests": self.requests,
+            "errors": self.errors,
+            "ejections": self.ejections,
+            "ejected_for_s": round(max(self.ejected_until - time.monotonic(), 0.0), 3)
+            if self.state != STATE_HEALTHY else 0.0,
+            "last_status": self.last_status,
+        }
+
+
+class EndpointPool:
+    """带健康检查的上游端点池。"""
+
+    def __init__(self, endpoints: List[Endpoint], strategy: str = STRATEGY_LEAST_OUTSTANDING,
+                 eject_seconds: float = 10.0, max_eject_seconds: float = 300.0,
+                 ewma_alpha: float = 0.3, probe_path: str = "/models", probe_timeout: float = 5.0):
+        """初始化端点池。
+
+        Args:
+            endpoints: 端点列表
+            strategy: 选择策略，"least_outstanding"或"ewma"
+            eject_seconds: 首次摘除时长（秒），连续失败时翻倍
+            max_eject_seconds: 最长摘除时长（秒）
+            ewma_alpha: EWMA延迟的平滑系数
+            probe_path: 探活请求路径（相对基础URL）
+            probe_timeout: 探活请求超时（秒）
+        """
+        if not endpoints:
+            raise ValueError("端点池至少需要一个端点")
+        if strategy not in (STRATEGY_LEAST_OUTSTANDING, STRATEGY_EWMA):
+            raise ValueError(f"未知的端点选择策略: {strategy}")
+        self.endpoints = endpoints
+        self.strategy = strategy
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.ewma_alpha = ewma_alpha
+        self.probe_path = probe_path
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+
+    def _score(self, endpoint: Endpoint) -> tuple:
+        latency = endpoint.ewma_ms or 0.0
+        if self.strategy == STRATEGY_EWMA:
+            # 延迟按未完成请求数加权，避免所有请求涌向同一个最快的端点
+            return (latency * (endpoint.outstanding + 1), endpoint.outstanding, random.random())
+        return (endpoint.outstanding, latency, random.random())
+
+    def acquire(self) -> Endpoint:
+        """选择一个端点并增加其未完成请求数。
+
+        所有端点都被摘除时，选择最早到期的端点，保证请求不会被直接拒绝。
+
+        Returns:
+            选中的端点
+        """
+        with self._lock:
+            healthy = [ep for ep in self.endpoints if ep.state == STATE_HEALTHY]
+            if healthy:
+                endpoint = min(healthy, key=self._score)
+            else:
+                endpoint = min(self.endpoints, key=lambda ep: ep.ejected_until)
+            endpoint.outstanding += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, latency: float,
+                status_code: Optional[int] = None, error: bool = False) -> None:
+        """记录请求结果并释放端点。
+
+        Args:
+            endpoint: 请求使用的端点
+            latency: 请求耗时（秒）
+            status_code: 响应状态码，请求异常时为None
+            error: 请求是否发生连接等异常
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.requests += 1
+            endpoint.last_status = status_code
+            if error or (status_code is not None and _should_eject(status_code)):
+                endpoint.errors += 1
+                self._eject(endpoint)
+                return
+            latency_ms = latency * 1000
+            if endpoint.ewma_ms is None:
+                endpoint.ewma_ms = latency_ms
+            else:
+                endpoint.ewma_ms += self.ewma_alpha * (latency_ms - endpoint.ewma_ms)
+
+    def _eject(self, endpoint: Endpoint) -> None:
+        """摘除端点，调用方需持有锁。"""
+        if endpoint.state == STATE_EJECTED:
+            return
+        endpoint.backoff = min(
+            endpoint.backoff * 2 if endpoint.backoff else self.eject_seconds,
+            self.max_eject_seconds
+        )
+        endpoint.ejected_until = time.monotonic() + endpoint.backoff
+        endpoint.state = STATE_EJECTED
+        endpoint.ejections += 1
+        logger.warning("上游端点 %s 已摘除 %.0f 秒", endpoint.name, endpoint.backoff)
+
+    def due_probes(self) -> List[Endpoint]:
+        """取出摘除已到期、需要探活的端点，并标记为探活中。
+
+        Returns:
+            需要探活的端点列表
+        """
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                ep for ep in self.endpoints
+                if ep.state == STATE_EJECTED and ep.ejected_until <= now
+            ]
+            for endpoint in due:
+                endpoint.state = STATE_PROBING
+            return due
+
+    def finish_probe(self, endpoint: Endpoint, ok: bool) -> None:
+        """记录探活结果。
+
+        Args:
+            endpoint: 探活的端点
+            ok: 探活是否成功
+        """
+        with self._lock:
+            if ok:
+                endpoint.state = STATE_HEALTHY
+                endpoint.backoff = 0.0
+                logger.info("上游端点 %s 探活成功，已恢复", endpoint.name)
+            else:
+                endpoint.state = STATE_HEALTHY  # 让_eject按退避时长重新摘除
+                self._eject(endpoint)
+
+    def _probe_request(self, endpoint: Endpoint) -> httpx.Request:
+        headers = {"Authorization": f"Bearer {endpoint.api_key}"} if endpoint.api_key else {}
+        return httpx.Request("GET", f"{endpoint.base_url}{self.probe_path}", headers=headers)
+
+    def probe(self, endpoint: Endpoint) -> bool:
+        """同步探活一个端点。
+
+        Args:
+            endpoint: 待探活的端点
+
+        Returns:
+            探活是否成功
+        """
+        try:
+            with httpx.Client(timeout=self.probe_timeout) as client:
+                ok = client.send(self._probe_request(endpoint)).status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        self.finish_probe(endpoint, ok)
+        return ok
+
+    async def aprobe(self, endpoint: Endpoint) -> bool:
+        """异步探活一个端点。
+
+        Args:
+            endpoint: 待探活的端点
+
+        Returns:
+            探活是否成功
+        """
+        try:
+            async with httpx.AsyncClient(timeout=self.probe_timeout) as client:
+                response = await client.send(self._probe_request(endpoint))
+                ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        self.finish_probe(endpoint, ok)
+        return ok
+
+    async def acheck(self) -> List[Endpoint]:
+        """并发探活所有端点，不可用的端点会被摘除。
+
+        用于服务启动时检查配置，探活在事件循环中异步进行，不阻塞其他请求。
+
+        Returns:
+            不可用的端点列表
+        """
+        results = await asyncio.gather(*(self.aprobe(endpoint) for endpoint in self.endpoints))
+        failed = [endpoint for endpoint, ok in zip(self.endpoints, results) if not ok]
+        for endpoint in failed:
+            logger.warning("上游端点 %s 的API密钥无效或服务不可用，请检查配置", endpoint.name)
+        return failed
+
+    def rewrite(self, request: httpx.Request, endpoint: Endpoint) -> None:
+        """将发往虚拟基础URL的请求改写到端点。
+
+        认证头总是按所选端点重新设置，未配置密钥的端点（如自建网关）不携带认证头，
+        避免把客户端的占位密钥或其他端点的密钥发给它。
+
+        Args:
+            request: 待发送的请求
+            endpoint: 选中的端点
+        """
+        target = httpx.URL(endpoint.base_url + request.url.raw_path.decode("ascii"))
+        request.url = target
+        request.headers["Host"] = target.netloc.decode("ascii")
+        if endpoint.api_key:
+            request.headers["Authorization"] = f"Bearer {endpoint.api_key}"
+        else:
+            request.headers.pop("Authorization", None)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取端点池统计。
+
+        Returns:
+            选择策略与各端点统计
+        """
+        with self._lock:
+            return {
+                "strategy": self.strategy,
+                "endpoints": [endpoint.as_dict() for endpoint in self.endpoints],
+            }
+
+
+class PoolTransport(httpx.BaseTransport):
+    """按端点池路由请求的同步httpx传输层。"""
+
+    def __init__(self, pool: EndpointPool, transport: Optional[httpx.BaseTransport] = None):
+        """初始化传输层。
+
+        Args:
+            pool: 端点池
+            transport: 实际发送请求的传输层
+        """
+        self.pool = pool
+        self._transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        for endpoint in self.pool.due_probes():
+            threading.Thread(target=self.pool.probe, args=(endpoint,), daemon=True).start()
+        endpoint = self.pool.acquire()
+        self.pool.rewrite(request, endpoint)
+        started = time.perf_counter()
+        try:
+            response = self._transport.handle_request(request)
+        except Exception:
+            self.pool.release(endpoint, time.perf_counter() - started, error=True)
+            raise
+        self.pool.release(endpoint, time.perf_counter() - started, response.status_code)
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncPoolTransport(httpx.AsyncBaseTransport):
+    """按端点池路由请求的异步httpx传输层。"""
+
+    def __init__(self, pool: EndpointPool, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """初始化传输层。
+
+        Args:
+            pool: 端点池
+            transport: 实际发送请求的传输层
+        """
+        self.pool = pool
+        self._transport = transport or httpx.AsyncHTTPTransport()
+        self._probes = set()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        for endpoint in self.pool.due_probes():
+            task = asyncio.get_running_loop().create_task(self.pool.aprobe(endpoint))
+            self._probes.add(task)
+            task.add_done_callback(self._probes.discard)
+        endpoint = self.pool.acquire()
+        self.pool.rewrite(request, endpoint)
+        started = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            self.pool.release(endpoint, time.perf_counter() - started, error=True)
+            raise
+        self.pool.release(endpoint, time.perf_counter() - started, response.status_code)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+# 进程级端点池
+_pool: Optional[EndpointPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_upstream_pool() -> EndpointPool:
+    """获取（首次调用时根据配置创建）进程级端点池。
+
+    Returns:
+        端点池
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                endpoints = [
+                    Endpoint(item["base_url"], item.get("api_key"), item.get("name"))
+                    for item in config.upstream_endpoints
+                ]
+                _pool = EndpointPool(endpoints, strategy=config.upstream_strategy)
+    return _pool
@@ -0,0 +1,8 @@
+"""进程内热点路径的微基准测试。
+
+离线运行（使用假语言模型），报告每秒操作数与单次操作的内存分配，
+并与保存的基线比较，发现回归时以非零状态退出::
+
+    python -m benchmarks --save-baseline     # 记录基线
+    python -m benchmarks                     # 与基线比较
+"""
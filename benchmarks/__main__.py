@@ -0,0 +1,74 @@
+"""微基准测试命令行入口。"""
+import argparse
+import os
+import sys
+
+from benchmarks import cases  # noqa: F401  注册基准测试
+from benchmarks.harness import compare, load_baseline, registered, run_benchmark, save_baseline
+
+# 默认基线文件
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def main(argv=None) -> int:
+    """运行基准测试。
+
+    Args:
+        argv: 命令行参数
+
+    Returns:
+        退出状态，存在回归时为1，没有匹配的测试或缺少基线时为2
+    """
+    parser = argparse.ArgumentParser(description="ChatVerse热点路径微基准测试")
+    parser.add_argument('-k', '--filter', help='只运行名称包含该子串的基准测试')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线文件路径')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果保存为基线')
+    parser.add_argument('--no-baseline', action='store_true', help='基线不存在时仍然运行，只报告结果')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='视为回归的相对变化，默认0.2（吞吐下降或内存分配增加超过20%%）')
+    parser.add_argument('--min-time', type=float, default=0.5, help='每个基准测试的计时时长（秒）')
+    parser.add_argument('--repeat', type=int, default=5, help='计时轮数，取最快一轮')
+    args = parser.parse_args(argv)
+
+    benches = registered(args.filter)
+    if not benches:
+        print("没有匹配的基准测试", file=sys.stderr)
+        return 2
+
+    baseline = {}
+    if not args.save_baseline:
+        if os.path.exists(args.baseline):
+            baseline = load_baseline(args.baseline)
+        elif not args.no_baseline:
+            # 没有基线时无法发现回归，作为部署前检查不能静默通过
+            print(f"基线文件不存在：{args.baseline}\n"
+                  "请先使用 --save-baseline 记录基线，或使用 --no-baseline 只报告结果",
+                  file=sys.stderr)
+            return 2
+
+    width = max(len(bench.name) for bench in benches)
+    print(f"{'benchmark':<{width}}  {'ops/s':>12}  {'B/op':>10}  {'vs baseline':>11}")
+    results = []
+    regressed = False
+    for bench in benches:
+        result = run_benchmark(bench, min_time=args.min_time, repeat=args.repeat)
+        results.append(result)
+        if result.skipped:
+            print(f"{result.name:<{width}}  跳过：{result.skipped}")
+            continue
+        base = baseline.get(result.name)
+        change = f"{result.ops_per_sec / base['ops_per_sec'] - 1:+.1%}" if base else "-"
+        print(f"{result.name:<{width}}  {result.ops_per_sec:>12,.0f}  "
+              f"{result.alloc_bytes_per_op:>10,.0f}  {change:>11}")
+        for regression in compare(result, base, args.threshold):
+            regressed = True
+            print(f"  回归：{regression}")
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"基线已保存到 {args.baseline}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""每轮对话都会经过的热点路径基准测试。
+
+依赖LangChain记忆组件的测试在依赖不可用时会被跳过。
+"""
+import itertools
+import tempfile
+
+from benchmarks.fake_llm import FAKE_RESPONSE, fake_llm
+from benchmarks.harness import benchmark
+
+# 参数化的对话历史长度（消息条数）
+HISTORY_SIZES = (10, 100, 1000)
+
+# 聊天模型缓存中预置的对话数
+CACHED_CONVERSATIONS = 1000
+
+_USER_MESSAGE = "请介绍一下ChatVerse的架构，以及它如何使用LangChain和FastAPI。"
+
+
+def _fill_history(service, conversation_id: str, size: int) -> None:
+    for i in range(size):
+        role = "user" if i % 2 == 0 else "assistant"
+        content = _USER_MESSAGE if role == "user" else FAKE_RESPONSE
+        service.save_message(conversation_id, role, content)
+
+
+def _trimmed_save(service, conversation_id: str, size: int):
+    """保存消息后把对话截回size条，使每次操作都在相同的历史长度下进行。
+
+    否则计时与校准循环会向同一个对话追加数量不定的消息，
+    不同历史长度的测试实际测量的是同一个不断增长的列表。
+    """
+    history = service.get_conversation_history(conversation_id)
+
+    def op():
+        service.save_message(conversation_id, "user", _USER_MESSAGE)
+        del history.messages[size:]
+    return op
+
+
+def _register_chat_service(size: int) -> None:
+    @benchmark(f"chat_service.save_message[history={size}]")
+    def save_message(stack):
+        from app.services.chat_service import ChatService
+
+        service = ChatService()
+        _fill_history(service, "bench", size)
+        return _trimmed_save(service, "bench", size)
+
+    @benchmark(f"chat_service.get_messages[history={size}]")
+    def get_messages(stack):
+        from app.services.chat_service import ChatService
+
+        service = ChatService()
+        _fill_history(service, "bench", size)
+        return lambda: service.get_messages("bench")
+
+    @benchmark(f"chat_service.get_messages[fork,history={size}]")
+    def get_forked_messages(stack):
+        from app.services.chat_service import ChatService
+
+        service = ChatService()
+        _fill_history(service, "bench", size)
+        service.fork_conversation("bench", "branch", at=size // 2)
+        service.save_message("branch", "user", _USER_MESSAGE)
+        return lambda: service.get_messages("branch")
+
+
+for _size in HISTORY_SIZES:
+    _register_chat_service(_size)
+
+
+@benchmark("chat_service.save_message[persist]")
+def save_message_persist(stack):
+    from app.services.chat_service import ChatService
+
+    data_dir = stack.enter_context(tempfile.TemporaryDirectory())
+    service = ChatService(data_dir=data_dir)
+    stack.callback(service.close)
+    service.save_message("bench", "user", _USER_MESSAGE)
+    return _trimmed_save(service, "bench", 1)
+
+
+@benchmark("chat_api.chat_cache_lookup")
+def chat_cache_lookup(stack):
+    from app.agents.conversation_models import ConversationModels
+    from app.api import chat
+
+    conversation_ids = [f"bench-{i}" for i in range(CACHED_CONVERSATIONS)]
+    for conversation_id in conversation_ids:
+        chat._chat_cache[conversation_id] = ConversationModels()
+
+    @stack.callback
+    def cleanup():
+        for conversation_id in conversation_ids:
+            chat._chat_cache.pop(conversation_id, None)
+
+    ids = itertools.cycle(conversation_ids)
+    return lambda: chat._get_chat_models(next(ids))
+
+
+@benchmark("agent.construct")
+def agent_construct(stack):
+    from app.agents.conversation_models import ConversationModels
+    from app.agents.router import ROUTE_AGENT
+
+    stack.enter_context(fake_llm())
+    return lambda: ConversationModels().get(ROUTE_AGENT)
+
+
+def _register_agent_chain(size: int) -> None:
+    @benchmark(f"agent.lcel_chain[history={size}]")
+    def lcel_chain(stack):
+        from app.agents.conversation_models import ConversationModels
+        from app.agents.router import ROUTE_AGENT
+
+        stack.enter_context(fake_llm())
+        models = ConversationModels()
+        for _ in range(size // 2):
+            models.remember(_USER_MESSAGE, FAKE_RESPONSE)
+        agent = models.get(ROUTE_AGENT)
+        # 链中包含记忆读取与提示词格式化，假语言模型只返回固定回复
+        return lambda: agent.chain.invoke({"input": _USER_MESSAGE})
+
+
+for _size in HISTORY_SIZES:
+    _register_agent_chain(_size)
+
+
+@benchmark("tools.search_knowledge_base")
+def search_knowledge_base(stack):
+    from app.agents.tools import search_knowledge_base as search
+
+    queries = itertools.cycle(["langchain", "deep", "不存在的词"])
+    return lambda: search(next(queries))
+
+
+@benchmark("tools.search_knowledge_base[runtime_cached]")
+def search_knowledge_base_cached(stack):
+    from app.agents.tools import _runtime, create_agent_tools
+
+    create_agent_tools()
+    return lambda: _runtime.call("search_knowledge_base", "langchain")
+
+
+def _register_chat_response(label: str, length: int) -> None:
+    @benchmark(f"schemas.chat_response[{label}]")
+    def chat_response(stack):
+        from app.schemas.chat import ChatResponse
+
+        response = (FAKE_RESPONSE * (length // len(FAKE_RESPONSE) + 1))[:length]
+        return lambda: ChatResponse(
+            response=response,
+            conversation_id="0f8fad5b-d9cb-469f-a165-70867728950e",
+            thoughts=[]
+        ).model_dump_json()
+
+
+_register_chat_response("short", 64)
+_register_chat_response("long", 8192)
@@ -0,0 +1,29 @@
+"""离线基准测试使用的假语言模型。"""
+import contextlib
+from typing import Iterator
+from unittest import mock
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+# 假语言模型的固定回复
+FAKE_RESPONSE = "这是用于基准测试的固定回复，不会访问任何上游服务。"
+
+
+class FakeChatModel(FakeListChatModel):
+    """支持 ``bind_tools`` 的假聊天模型，始终返回固定回复。"""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def create_fake_llm(*args, **kwargs) -> FakeChatModel:
+    """与 ``create_llm`` 签名兼容的假语言模型工厂。"""
+    return FakeChatModel(responses=[FAKE_RESPONSE])
+
+
+@contextlib.contextmanager
+def fake_llm() -> Iterator[None]:
+    """在上下文内让聊天模型使用假语言模型。"""
+    with mock.patch("app.agents.chat_agent.create_llm", create_fake_llm), \
+            mock.patch("app.agents.simple_chat.create_llm", create_fake_llm):
+        yield
@@ -0,0 +1,200 @@
+"""微基准测试框架：注册、计时、内存分配统计与基线比较。"""
+import contextlib
+import gc
+import json
+import platform
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+# setup函数接收ExitStack用于注册清理操作，返回待测的无参操作
+Setup = Callable[[contextlib.ExitStack], Callable[[], Any]]
+
+# 统计内存分配时执行的次数
+ALLOC_SAMPLES = 200
+
+# 单次操作分配字节数的比较容差，避免极小的分配因解释器内部缓存产生误报
+ALLOC_SLACK_BYTES = 64
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    """一个已注册的基准测试。"""
+
+    name: str
+    setup: Setup
+
+
+@dataclass
+class BenchmarkResult:
+    """基准测试结果。"""
+
+    name: str
+    ops_per_sec: Optional[float] = None
+    alloc_bytes_per_op: Optional[float] = None
+    iterations: int = 0
+    skipped: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """导出用于基线文件的结果。"""
+        return {
+            "ops_per_sec": round(self.ops_per_sec, 3),
+            "alloc_bytes_per_op": round(self.alloc_bytes_per_op, 1),
+        }
+
+
+_registry: List[Benchmark] = []
+
+
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    """注册基准测试的装饰器。
+
+    Args:
+        name: 基准测试名称，参数化的测试在名称中用方括号标注参数
+
+    Returns:
+        装饰器
+    """
+    def decorator(setup: Setup) -> Setup:
+        _registry.append(Benchmark(name, setup))
+        return setup
+    return decorator
+
+
+def registered(pattern: Optional[str] = None) -> List[Benchmark]:
+    """获取已注册的基准测试。
+
+    Args:
+        pattern: 名称过滤子串
+
+    Returns:
+        名称包含过滤子串的基准测试列表
+    """
+    return [bench for bench in _registry if not pattern or pattern in bench.name]
+
+
+def _time(op: Callable[[], Any], number: int) -> float:
+    """执行操作number次并返回总耗时（秒）。"""
+    loop = range(number)
+    started = time.perf_counter()
+    for _ in loop:
+        op()
+    return time.perf_counter() - started
+
+
+def _alloc_per_op(op: Callable[[], Any], samples: int) -> float:
+    """统计单次操作的平均峰值内存分配（字节），含操作中的临时对象与保留的对象。"""
+    tracemalloc.start()
+    try:
+        total = 0
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            op()
+            total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return total / samples
+
+
+def run_benchmark(bench: Benchmark, min_time: float = 0.5, repeat: int = 5) -> BenchmarkResult:
+    """运行一个基准测试。
+
+    先在tracemalloc下执行固定次数统计内存分配（有状态的操作因此在每次运行中
+    处于相同状态），再倍增执行次数直到单轮耗时达到 ``min_time / repeat``，
+    重复计时取最快一轮，计时期间关闭垃圾回收。
+    依赖无法导入的基准测试会被跳过。
+
+    Args:
+        bench: 基准测试
+        min_time: 计时阶段的目标总耗时（秒）
+        repeat: 计时轮数
+
+    Returns:
+        基准测试结果
+    """
+    with contextlib.ExitStack() as stack:
+        try:
+            op = bench.setup(stack)
+        except ImportError as e:
+            return BenchmarkResult(bench.name, skipped=f"依赖不可用: {e}")
+        op()
+        alloc = _alloc_per_op(op, ALLOC_SAMPLES)
+
+        target = min_time / repeat
+        number = 1
+        while _time(op, number) < target:
+            number *= 2
+
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            best = min(_time(op, number) for _ in range(repeat))
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        return BenchmarkResult(
+            bench.name,
+            ops_per_sec=number / best,
+            alloc_bytes_per_op=alloc,
+            iterations=number * repeat
+        )
+
+
+def save_baseline(path: str, results: List[BenchmarkResult]) -> None:
+    """保存基线。
+
+    Args:
+        path: 基线文件路径
+        results: 基准测试结果
+    """
+    payload = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {result.name: result.as_dict() for result in results if not result.skipped},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_baseline(path: str) -> Dict[str, Dict[str, float]]:
+    """读取基线。
+
+    Args:
+        path: 基线文件路径
+
+    Returns:
+        以基准测试名称为键的基线结果
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare(result: BenchmarkResult, baseline: Optional[Dict[str, float]],
+            threshold: float) -> List[str]:
+    """与基线比较，返回回归项。
+
+    Args:
+        result: 基准测试结果
+        baseline: 该测试的基线结果，没有基线时为None
+        threshold: 允许的相对变化，如0.2表示吞吐下降或分配增加超过20%视为回归
+
+    Returns:
+        回归描述列表，没有回归时为空
+    """
+    if result.skipped or not baseline:
+        return []
+    regressions = []
+    if result.ops_per_sec < baseline["ops_per_sec"] * (1 - threshold):
+        regressions.append(
+            f"吞吐 {baseline['ops_per_sec']:.0f} -> {result.ops_per_sec:.0f} ops/s"
+        )
+    allowed = baseline["alloc_bytes_per_op"] * (1 + threshold) + ALLOC_SLACK_BYTES
+    if result.alloc_bytes_per_op > allowed:
+        regressions.append(
+            f"内存分配 {baseline['alloc_bytes_per_op']:.0f} -> {result.alloc_bytes_per_op:.0f} B/op"
+        )
+    return regressions
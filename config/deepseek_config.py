@@ -1,4 +1,5 @@
 import os
+import json
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
@@ -42,5 +43,123 @@ class Config:
     def chat_model(self):
         """获取聊天模型名称。"""
         return os.getenv('deepseek_model', "deepseek-chat")
+    
+    @property
+    def upstream_endpoints(self):
+        """获取上游端点列表。
+        
+        优先使用 ``UPSTREAM_ENDPOINTS``（JSON数组，元素含base_url、api_key、name），
+        否则由逗号分隔的 ``deepseek_api_keys`` 与 ``deepseek_base_urls`` 组合：
+        数量相同时一一对应，否则两两组合；未设置时退回单个密钥与基础URL。
+        """
+        raw = os.getenv('UPSTREAM_ENDPOINTS')
+        if raw:
+            return json.loads(raw)
+        keys = [k.strip() for k in os.getenv('deepseek_api_keys', '').split(',') if k.strip()]
+        urls = [u.strip() for u in os.getenv('deepseek_base_urls', '').split(',') if u.strip()]
+        keys = keys or [self.api_key]
+        urls = urls or [self.base_url]
+        if len(keys) == len(urls):
+            pairs = zip(urls, keys)
+        else:
+            pairs = ((url, key) for url in urls for key in keys)
+        return [{"base_url": url, "api_key": key} for url, key in pairs]
+    
+    @property
+    def upstream_strategy(self):
+        """获取上游端点选择策略（least_outstanding或ewma）。"""
+        return os.getenv('UPSTREAM_STRATEGY', "least_outstanding")
+    
+    @property
+    def use_simple_chat(self) -> bool:
+        """是否只使用简单聊天模式（不使用Agent框架）。"""
+        return os.getenv('USE_SIMPLE_CHAT', 'false').lower() == 'true'
+    
+    def route_model(self, route: str):
+        """获取指定路由使用的模型名称，默认与聊天模型相同。"""
+        return os.getenv(f'ROUTE_{route.upper()}_MODEL') or self.chat_model
+    
+    def route_max_tokens(self, route: str):
+        """获取指定路由的最大生成token数，未设置时返回None。"""
+        value = os.getenv(f'ROUTE_{route.upper()}_MAX_TOKENS')
+        return int(value) if value else None
+    
+    @property
+    def log_level(self):
+        """获取日志级别。设置为PROMPT时同时输出完整提示词。"""
+        return os.getenv('LOG_LEVEL', "INFO").upper()
+    
+    @property
+    def log_format(self):
+        """获取日志输出格式（json或text）。"""
+        return os.getenv('LOG_FORMAT', "json").lower()
+    
+    @property
+    def log_prompts(self) -> bool:
+        """是否输出完整提示词。"""
+        return self.log_level == "PROMPT" or os.getenv('LOG_PROMPTS', 'false').lower() == 'true'
+    
+    @property
+    def log_sample_rate(self) -> float:
+        """获取高频事件日志的采样比例。"""
+        return float(os.getenv('LOG_SAMPLE_RATE', "0.01"))
+    
+    @property
+    def admin_token(self):
+        """获取管理接口令牌，未设置时管理接口不可用。"""
+        return os.getenv('CHATVERSE_ADMIN_TOKEN') or None
+    
+    @property
+    def chat_data_dir(self):
+        """获取聊天记录持久化目录，未设置时仅保存在内存中。"""
+        return os.getenv('CHAT_DATA_DIR') or None
+    
+    @property
+    def chat_spill_dir(self):
+        """获取空闲对话的转存目录，默认位于持久化目录下，均未设置时不启用分层存储。"""
+        spill_dir = os.getenv('CHAT_SPILL_DIR')
+        if not spill_dir and self.chat_data_dir:
+            spill_dir = os.path.join(self.chat_data_dir, "spill")
+        return spill_dir or None
+    
+    @property
+    def chat_idle_seconds(self) -> float:
+        """获取对话空闲多久后转存到磁盘（秒）。"""
+        return float(os.getenv('CHAT_IDLE_SECONDS', "300"))
+    
+    @property
+    def chat_spill_codec(self):
+        """获取转存使用的压缩算法（zlib或lzma）。"""
+        return os.getenv('CHAT_SPILL_CODEC', "zlib")
+    
+    @property
+    def chat_spill_batch(self) -> int:
+        """获取写入路径上每次最多转存的空闲对话数。"""
+        return int(os.getenv('CHAT_SPILL_BATCH', "16"))
+    
+    @property
+    def ws_max_concurrent_turns(self) -> int:
+        """获取单个WebSocket连接上同时处理的最大轮次数。"""
+        return int(os.getenv('WS_MAX_CONCURRENT_TURNS', "4"))
+    
+    @property
+    def ws_max_pending_turns(self) -> int:
+        """获取单个WebSocket连接上允许排队（含处理中）的最大轮次数。"""
+        return int(os.getenv('WS_MAX_PENDING_TURNS', "32"))
+    
+    @property
+    def ws_send_queue_size(self) -> int:
+        """获取单个WebSocket连接的发送队列容量，队列满时处理中的轮次等待客户端读取。"""
+        return int(os.getenv('WS_SEND_QUEUE_SIZE', "64"))
+    
+    @property
+    def idempotency_ttl(self) -> float:
+        """获取幂等键对应结果的保留时间（秒）。"""
+        return float(os.getenv('IDEMPOTENCY_TTL', "86400"))
+    
+    @property
+    def idempotency_max_keys(self) -> int:
+        """获取最多保留结果的幂等键数量。"""
+        return int(os.getenv('IDEMPOTENCY_MAX_KEYS', "10000"))
 
 config = Config() 
\ No newline at end of file
@@ -2,19 +2,12 @@
 import argparse
 import logging
 import os
-import sys
 
 import uvicorn
 from dotenv import load_dotenv
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from app.core.logging_config import setup_logging
+from config.deepseek_config import config
 
 # 加载环境变量
 load_dotenv()
@@ -27,8 +20,17 @@ def main():
     parser.add_argument('--reload', action='store_true', help='是否启用热重载')
     parser.add_argument('--local-mode', action='store_true', help='是否使用本地模式（不调用外部API）')
     parser.add_argument('--simple-chat', action='store_true', help='使用简单聊天模式（不使用Agent框架）')
+    parser.add_argument('--log-level', default=os.getenv('LOG_LEVEL', 'INFO'),
+                        help='日志级别，PROMPT表示DEBUG级别并输出完整提示词')
+    parser.add_argument('--log-format', choices=['json', 'text'], default=os.getenv('LOG_FORMAT', 'json'),
+                        help='日志输出格式')
     args = parser.parse_args()
     
+    # 配置日志，并传递给服务进程；此处的配置先于app.main生效，需使用完整的日志配置
+    os.environ['LOG_LEVEL'] = args.log_level.upper()
+    os.environ['LOG_FORMAT'] = args.log_format
+    setup_logging(level=config.log_level, fmt=config.log_format, log_prompts=config.log_prompts)
+    
     # 设置本地模式环境变量
     if args.local_mode:
         os.environ['USE_LOCAL_MODE'] = 'true'
@@ -52,7 +54,9 @@ def main():
         "app.main:app",
         host=args.host,
         port=args.port,
-        reload=args.reload
+        reload=args.reload,
+        # 不使用uvicorn自带的同步日志配置，访问日志经根日志器的队列异步输出
+        log_config=None
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,51 @@
+"""微基准测试框架测试。"""
+from benchmarks.__main__ import main
+from benchmarks.harness import Benchmark, compare, load_baseline, run_benchmark, save_baseline
+
+
+def test_run_benchmark_reports_throughput_and_allocations():
+    """测试基准测试结果包含吞吐与内存分配。"""
+    def setup(stack):
+        return lambda: [0] * 1000
+
+    result = run_benchmark(Benchmark("list", setup), min_time=0.01, repeat=2)
+    assert result.skipped is None
+    assert result.ops_per_sec > 0
+    assert result.alloc_bytes_per_op >= 8000
+
+
+def test_missing_dependency_is_skipped():
+    """测试依赖不可用的基准测试被跳过。"""
+    def setup(stack):
+        import module_that_does_not_exist  # noqa: F401
+
+    result = run_benchmark(Benchmark("missing", setup))
+    assert result.skipped
+
+
+def test_baseline_roundtrip_and_regressions(tmp_path):
+    """测试基线保存与回归判断。"""
+    def setup(stack):
+        return lambda: None
+
+    result = run_benchmark(Benchmark("noop", setup), min_time=0.01, repeat=2)
+    path = str(tmp_path / "baseline.json")
+    save_baseline(path, [result])
+    baseline = load_baseline(path)["noop"]
+
+    assert compare(result, baseline, threshold=0.2) == []
+    result.ops_per_sec = baseline["ops_per_sec"] / 2
+    result.alloc_bytes_per_op = baseline["alloc_bytes_per_op"] * 2 + 1000
+    assert len(compare(result, baseline, threshold=0.2)) == 2
+
+
+def test_missing_baseline_fails_unless_opted_out(tmp_path, capsys):
+    """测试缺少基线时以非零状态退出，除非保存基线或显式跳过比较。"""
+    path = str(tmp_path / "baseline.json")
+    options = ["-k", "schemas.chat_response", "--baseline", path, "--min-time", "0.01", "--repeat", "1"]
+    assert main(options) == 2
+    assert "--save-baseline" in capsys.readouterr().err
+
+    assert main(options + ["--no-baseline"]) == 0
+    assert main(options + ["--save-baseline"]) == 0
+    assert load_baseline(path)
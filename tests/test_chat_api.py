@@ -1,4 +1,7 @@
 """聊天API测试。"""
+import asyncio
+import threading
+
 import pytest
 from fastapi.testclient import TestClient
 
@@ -48,3 +51,132 @@ def test_chat_history():
     assert response.status_code == 200
     assert "messages" in response.json()
     assert len(response.json()["messages"]) >= 2  # 至少有一对用户-助手消息
+
+
+def test_websocket_multiplexed_conversations():
+    """测试一个WebSocket连接上并发处理多个对话。"""
+    with client.websocket_connect("/chat/ws") as websocket:
+        websocket.send_json({"message": "你好", "conversation_id": "ws-a", "request_id": "r1"})
+        websocket.send_json({"message": "谢谢", "conversation_id": "ws-b", "request_id": "r2"})
+        
+        responses = {}
+        while len(responses) < 2:
+            frame = websocket.receive_json()
+            assert frame["request_id"] in ("r1", "r2")
+            if frame["type"] in ("response", "error"):
+                responses[frame["request_id"]] = frame["conversation_id"]
+        
+        assert responses == {"r1": "ws-a", "r2": "ws-b"}
+
+
+def test_search_requires_admin_token(monkeypatch):
+    """测试跨对话检索需要管理令牌。"""
+    monkeypatch.delenv("CHATVERSE_ADMIN_TOKEN", raising=False)
+    assert client.get("/chat/search", params={"q": "你好"}).status_code == 403
+    
+    monkeypatch.setenv("CHATVERSE_ADMIN_TOKEN", "secret")
+    response = client.get("/chat/search", params={"q": "你好"}, headers={"X-Admin-Token": "wrong"})
+    assert response.status_code == 401
+    
+    response = client.get("/chat/search", params={"q": "你好"}, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert "hits" in response.json()
+
+
+def test_idempotent_retry_after_failed_turn(monkeypatch):
+    """测试失败的轮次不会按幂等键重放，重试会重新处理，成功后才重放。"""
+    from app.api import chat as chat_api
+    
+    replies = iter([
+        {"response": "抱歉", "thoughts": [], "failed": True},
+        {"response": "你好！", "thoughts": []},
+    ])
+    
+    async def process_message(models, message):
+        return next(replies)
+    
+    monkeypatch.setattr(chat_api.model_router, "process_message", process_message)
+    headers = {"Idempotency-Key": "retry-after-failure"}
+    
+    first = client.post("/chat/message", json={"message": "你好"}, headers=headers)
+    assert first.json()["response"] == "抱歉"
+    
+    retry = client.post("/chat/message", json={"message": "你好"}, headers=headers)
+    assert retry.json()["response"] == "你好！"
+    assert "Idempotent-Replayed" not in retry.headers
+    
+    replay = client.post("/chat/message", json={"message": "你好"}, headers=headers)
+    assert replay.json()["response"] == "你好！"
+    assert replay.headers["Idempotent-Replayed"] == "true"
+
+
+class _BlockingTurn:
+    """阻塞在asyncio.Event上的LLM调用替身，由测试线程决定何时返回。"""
+    
+    def __init__(self):
+        self.started = threading.Event()
+        self.messages = []
+        self._loop = None
+        self._release = None
+    
+    async def process_message(self, models, message):
+        self._loop = asyncio.get_running_loop()
+        self._release = asyncio.Event()
+        self.messages.append(message)
+        self.started.set()
+        await self._release.wait()
+        return {"response": f"回复：{message}", "thoughts": []}
+    
+    def release(self):
+        self._loop.call_soon_threadsafe(self._release.set)
+
+
+def _receive_final(websocket):
+    """跳过thinking帧，返回下一个帧。"""
+    frame = websocket.receive_json()
+    while frame["type"] == "thinking":
+        frame = websocket.receive_json()
+    return frame
+
+
+def test_websocket_cancel_leaves_no_orphan_message(monkeypatch):
+    """测试处理中的请求被取消时收到cancelled帧，且不会留下没有回复的用户消息。"""
+    from app.api import chat as chat_api
+    
+    turn = _BlockingTurn()
+    monkeypatch.setattr(chat_api.model_router, "process_message", turn.process_message)
+    with client.websocket_connect("/chat/ws") as websocket:
+        websocket.send_json({"message": "讲一个很长的故事", "conversation_id": "ws-cancel", "request_id": "r1"})
+        assert turn.started.wait(5)
+        websocket.send_json({"type": "cancel", "request_id": "r1"})
+        
+        frame = _receive_final(websocket)
+        assert frame["type"] == "cancelled"
+        assert frame["request_id"] == "r1"
+    
+    assert client.get("/chat/history/ws-cancel").status_code == 404
+
+
+def test_websocket_cancel_while_queued_behind_conversation_lock(monkeypatch):
+    """测试在对话锁后排队的请求被取消时收到cancelled帧，且不会被处理或保存。"""
+    from app.api import chat as chat_api
+    
+    turn = _BlockingTurn()
+    monkeypatch.setattr(chat_api.model_router, "process_message", turn.process_message)
+    with client.websocket_connect("/chat/ws") as websocket:
+        websocket.send_json({"message": "第一条", "conversation_id": "ws-queued", "request_id": "r1"})
+        assert turn.started.wait(5)
+        websocket.send_json({"message": "第二条", "conversation_id": "ws-queued", "request_id": "r2"})
+        websocket.send_json({"type": "cancel", "request_id": "r2"})
+        
+        frame = _receive_final(websocket)
+        assert frame == {"type": "cancelled", "conversation_id": "ws-queued", "request_id": "r2"}
+        
+        turn.release()
+        frame = _receive_final(websocket)
+        assert frame["type"] == "response"
+        assert frame["request_id"] == "r1"
+    
+    assert turn.messages == ["第一条"]
+    messages = client.get("/chat/history/ws-queued").json()["messages"]
+    assert [m["content"] for m in messages] == ["第一条", "回复：第一条"]
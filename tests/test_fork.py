@@ -0,0 +1,72 @@
+"""对话分支测试。"""
+import pytest
+
+from app.services.chat_service import ChatService
+
+
+def _conversation(service, conversation_id, count):
+    for i in range(count):
+        service.save_message(conversation_id, "user" if i % 2 == 0 else "assistant", f"消息{i}")
+
+
+def test_fork_shares_prefix_without_copying():
+    """测试分支共享前缀，且不受父对话后续消息影响。"""
+    service = ChatService()
+    _conversation(service, "main", 1000)
+
+    assert service.fork_conversation("main", "branch", at=4) == 4
+    assert service._conversations["branch"].messages == []
+
+    service.save_message("branch", "user", "改写后的消息")
+    service.save_message("main", "user", "主线的新消息")
+
+    branch = [m.content for m in service.get_messages("branch")]
+    assert branch == ["消息0", "消息1", "消息2", "消息3", "改写后的消息"]
+    assert len(service.get_messages("main")) == 1001
+    assert service.get_conversation_history("branch").conversation_id == "branch"
+
+
+def test_nested_fork_and_search_positions():
+    """测试分支的分支，以及检索结果中的消息下标。"""
+    service = ChatService()
+    _conversation(service, "main", 6)
+    service.fork_conversation("main", "a", at=5)
+    service.save_message("a", "user", "分支甲的独有内容")
+    service.fork_conversation("a", "b", at=3)
+    service.save_message("b", "user", "分支乙的独有内容")
+
+    assert [m.content for m in service.get_messages("b")] == ["消息0", "消息1", "消息2", "分支乙的独有内容"]
+    assert service.fork_conversation("b", "c") == 4
+
+    hit = service.search("分支甲").hits[0]
+    assert (hit.conversation_id, hit.message_index) == ("a", 5)
+    assert service.get_messages("a")[hit.message_index].content == "分支甲的独有内容"
+
+
+def test_fork_validation():
+    """测试分叉位置与对话ID校验。"""
+    service = ChatService()
+    _conversation(service, "main", 2)
+    assert service.fork_conversation("missing", "x") is None
+    with pytest.raises(ValueError):
+        service.fork_conversation("main", "x", at=3)
+    service.fork_conversation("main", "x")
+    with pytest.raises(ValueError):
+        service.fork_conversation("main", "x")
+
+
+def test_fork_survives_restart_and_spill(tmp_path):
+    """测试分支记录写入日志，并可与父对话一起转存与恢复。"""
+    data_dir = tmp_path / "data"
+    service = ChatService(data_dir=str(data_dir))
+    _conversation(service, "main", 4)
+    service.fork_conversation("main", "branch", at=2)
+    service.save_message("branch", "user", "分支消息")
+    service.close()
+
+    restored = ChatService(data_dir=str(data_dir), spill_dir=str(tmp_path / "spill"), idle_seconds=60)
+    expected = ["消息0", "消息1", "分支消息"]
+    last = restored.get_messages("branch")[-1].timestamp
+    assert sorted(restored.spill_idle(now=last + 3600)) == ["branch", "main"]
+    assert [m.content for m in restored.get_messages("branch")] == expected
+    assert restored.storage_stats()["resident_conversations"] == 2
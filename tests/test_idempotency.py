@@ -0,0 +1,104 @@
+"""请求幂等测试。"""
+import asyncio
+
+import pytest
+
+from app.services.idempotency import IdempotencyConflictError, IdempotencyStore, request_fingerprint
+
+
+def _counting_call(calls, value="回复", delay=0.05, succeeded=True):
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value, succeeded
+    return call
+
+
+def test_concurrent_duplicates_share_one_execution():
+    """测试执行中的重复请求只执行一次。"""
+    async def scenario():
+        store = IdempotencyStore()
+        calls = []
+        fingerprint = request_fingerprint({"message": "你好"})
+        results = await asyncio.gather(*[
+            store.run("key-1", fingerprint, _counting_call(calls)) for _ in range(5)
+        ])
+        replayed = await store.run("key-1", fingerprint, _counting_call(calls))
+        return calls, results, replayed
+
+    calls, results, replayed = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert [value for value, _ in results] == ["回复"] * 5
+    assert sorted(flag for _, flag in results) == [False, True, True, True, True]
+    assert replayed == ("回复", True)
+
+
+def test_conflicting_payload_rejected():
+    """测试同一个键携带不同内容时报冲突。"""
+    async def scenario():
+        store = IdempotencyStore()
+        await store.run("key-1", request_fingerprint({"message": "a"}), _counting_call([]))
+        await store.run("key-1", request_fingerprint({"message": "b"}), _counting_call([]))
+
+    with pytest.raises(IdempotencyConflictError):
+        asyncio.run(scenario())
+
+
+def test_failures_are_not_stored():
+    """测试执行失败后重试会重新执行。"""
+    async def scenario():
+        store = IdempotencyStore()
+
+        async def fail():
+            raise RuntimeError("上游错误")
+
+        with pytest.raises(RuntimeError):
+            await store.run("key-1", "fp", fail)
+        return await store.run("key-1", "fp", _counting_call([], delay=0))
+
+    assert asyncio.run(scenario()) == ("回复", False)
+
+
+def test_failed_results_are_not_stored():
+    """测试返回失败的结果只共享给执行中的重复请求，之后的重试会重新执行。"""
+    async def scenario():
+        store = IdempotencyStore()
+        calls = []
+        failed = await asyncio.gather(
+            store.run("key-1", "fp", _counting_call(calls, value="抱歉", succeeded=False)),
+            store.run("key-1", "fp", _counting_call(calls, value="抱歉", succeeded=False)),
+        )
+        retry = await store.run("key-1", "fp", _counting_call(calls))
+        return calls, failed, retry
+
+    calls, failed, retry = asyncio.run(scenario())
+    assert [value for value, _ in failed] == ["抱歉", "抱歉"]
+    assert len(calls) == 2
+    assert retry == ("回复", False)
+
+
+def test_cancelled_caller_does_not_cancel_execution():
+    """测试首个请求断开后重试仍拿到同一个结果。"""
+    async def scenario():
+        store = IdempotencyStore()
+        calls = []
+        first = asyncio.ensure_future(store.run("key-1", "fp", _counting_call(calls)))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        retry = await store.run("key-1", "fp", _counting_call(calls))
+        return calls, retry
+
+    calls, retry = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert retry == ("回复", True)
+
+
+def test_completed_results_are_bounded():
+    """测试已完成结果按容量淘汰。"""
+    async def scenario():
+        store = IdempotencyStore(maxsize=2)
+        for i in range(4):
+            await store.run(f"key-{i}", "fp", _counting_call([], delay=0))
+        return len(store)
+
+    assert asyncio.run(scenario()) == 2
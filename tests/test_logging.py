@@ -0,0 +1,54 @@
+"""异步结构化日志测试。"""
+import json
+import logging
+import queue
+
+from app.core.logging_config import ContextFilter, JsonFormatter, NonBlockingQueueHandler, log_context
+
+
+def _capture():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+    handler.addFilter(ContextFilter())
+    logger = logging.getLogger("tests.logging")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger, handler
+
+
+def test_json_record_has_conversation_id_and_fields():
+    """测试JSON日志附带对话ID与结构化字段。"""
+    logger, handler = _capture()
+    with log_context("conv-1"):
+        logger.info("处理消息 %s", "你好", extra={"route": "simple"})
+
+    record = handler.queue.get_nowait()
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["message"] == "处理消息 你好"
+    assert payload["conversation_id"] == "conv-1"
+    assert payload["route"] == "simple"
+    assert payload["level"] == "INFO"
+
+
+def test_sampling_and_full_queue_never_block():
+    """测试采样丢弃与队列满时不阻塞。"""
+    logger, handler = _capture()
+    for _ in range(50):
+        logger.info("高频事件", extra={"sample_rate": 0.0})
+    assert handler.queue.empty()
+
+    for _ in range(5):
+        logger.info("普通事件")
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_exception_text_preserved():
+    """测试异常堆栈在入队前固化。"""
+    logger, handler = _capture()
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("失败")
+    payload = json.loads(JsonFormatter().format(handler.queue.get_nowait()))
+    assert "ValueError: boom" in payload["exc"]
@@ -0,0 +1,86 @@
+"""请求剖析测试。"""
+import asyncio
+import pstats
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import admin
+from app.core.profiling import Profiler
+
+
+def _busy(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+async def _turn(profiler: Profiler) -> None:
+    with profiler.turn("/chat/message", "c1"):
+        with profiler.stage("llm"):
+            await asyncio.sleep(0.01)
+            _busy(20000)
+        with profiler.stage("save_message"):
+            _busy(1000)
+
+
+def test_disabled_profiler_records_nothing():
+    """测试关闭时不采集剖析记录。"""
+    profiler = Profiler()
+    asyncio.run(_turn(profiler))
+    assert profiler.profiles() == []
+
+
+def test_sampled_turn_exports(tmp_path):
+    """测试采样的轮次可导出pstats与折叠栈。"""
+    profiler = Profiler(capacity=2)
+    profiler.configure(enabled=True, sample_rate=1.0)
+    for _ in range(3):
+        asyncio.run(_turn(profiler))
+
+    records = profiler.profiles()
+    assert len(records) == 2
+    record = records[0]
+    assert record.conversation_id == "c1"
+    assert set(record.stages) == {"llm", "save_message"}
+    assert record.stages["llm"] >= 10
+
+    path = tmp_path / "turn.pstats"
+    path.write_bytes(record.to_pstats())
+    stats = pstats.Stats(str(path))
+    assert any(name == "_busy" for _, _, name in stats.stats)
+
+    collapsed = record.to_collapsed()
+    lines = collapsed.strip().split("\n")
+    assert any("_busy" in line for line in lines)
+    for line in lines:
+        stack, _, weight = line.rpartition(" ")
+        assert stack
+        assert int(weight) >= 1
+
+
+def test_zero_sample_rate():
+    """测试采样比例为0时不采集。"""
+    profiler = Profiler()
+    profiler.configure(enabled=True, sample_rate=0.0)
+    asyncio.run(_turn(profiler))
+    assert profiler.profiles() == []
+
+
+def test_admin_endpoints_require_token(monkeypatch):
+    """测试剖析管理接口需要管理令牌。"""
+    app = FastAPI()
+    app.include_router(admin.router)
+    client = TestClient(app)
+
+    monkeypatch.delenv("CHATVERSE_ADMIN_TOKEN", raising=False)
+    assert client.get("/admin/profiling").status_code == 403
+
+    monkeypatch.setenv("CHATVERSE_ADMIN_TOKEN", "secret")
+    assert client.get("/admin/profiling", headers={"X-Admin-Token": "wrong"}).status_code == 401
+
+    headers = {"X-Admin-Token": "secret"}
+    response = client.put("/admin/profiling", json={"enabled": True, "sample_rate": 0.5}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["enabled"] is True
+    assert response.json()["sample_rate"] == 0.5
+    assert client.get("/admin/profiling/999/pstats", headers=headers).status_code == 404
+    client.put("/admin/profiling", json={"enabled": False}, headers=headers)
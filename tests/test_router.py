@@ -0,0 +1,105 @@
+"""模型路由测试。"""
+import asyncio
+
+from app.agents.router import ROUTE_AGENT, ROUTE_CACHE, ROUTE_SIMPLE, ModelRouter
+
+
+class FakeChat:
+    """记录调用次数的假聊天模型。"""
+
+    def __init__(self, route, history):
+        self.route = route
+        self.history = history
+        self.calls = 0
+
+    async def process_message(self, message):
+        self.calls += 1
+        # 回复包含对话上下文，模拟提示词中的聊天历史
+        context = "|".join(self.history)
+        self.history.append(message)
+        return {"response": f"{self.route}:{context}:{message}", "thoughts": []}
+
+
+class FakeModels:
+    """假对话模型集合。"""
+
+    def __init__(self, history=None):
+        self.history = list(history or [])
+        self.models = {
+            ROUTE_SIMPLE: FakeChat(ROUTE_SIMPLE, self.history),
+            ROUTE_AGENT: FakeChat(ROUTE_AGENT, self.history),
+        }
+        self.remembered = []
+
+    def get(self, route):
+        return self.models[route]
+
+    def remember(self, message, response):
+        self.remembered.append((message, response))
+        self.history.append(message)
+
+    def has_history(self):
+        return bool(self.history)
+
+
+def test_decide_routes():
+    """测试启发式路由决策。"""
+    router = ModelRouter()
+    assert router.decide("你好！").route == ROUTE_SIMPLE
+    assert router.decide("现在几点了？").route == ROUTE_AGENT
+    assert router.decide("What time is it?").route == ROUTE_AGENT
+    assert router.decide("帮我在知识库里查一下LangChain").route == ROUTE_AGENT
+    assert router.decide("给我讲个笑话").route == ROUTE_SIMPLE
+    assert ModelRouter(allow_agent=False).decide("现在几点了").route == ROUTE_SIMPLE
+
+
+def test_small_talk_answer_cached():
+    """测试寒暄答案被缓存并写入对话记忆。"""
+    router = ModelRouter()
+    models = FakeModels()
+
+    first = asyncio.run(router.process_message(models, "你好"))
+    second = asyncio.run(router.process_message(models, "你好！"))
+    assert first["route"] == ROUTE_SIMPLE
+    assert second["route"] == ROUTE_CACHE
+    assert second["response"] == first["response"]
+    assert models.models[ROUTE_SIMPLE].calls == 1
+    assert models.remembered == [("你好！", first["response"])]
+
+    stats = router.stats()
+    assert stats[ROUTE_CACHE]["count"] == 1
+    assert stats[ROUTE_SIMPLE]["reasons"] == {"small_talk": 1}
+
+
+def test_failed_answer_not_cached():
+    """测试失败的回复不会被缓存。"""
+    router = ModelRouter()
+    models = FakeModels()
+
+    async def failing(message):
+        return {"response": "抱歉", "thoughts": [], "failed": True}
+
+    models.models[ROUTE_SIMPLE].process_message = failing
+    asyncio.run(router.process_message(models, "谢谢"))
+    assert router.decide("谢谢").route == ROUTE_SIMPLE
+    assert router.stats()[ROUTE_SIMPLE]["failures"] == 1
+
+
+def test_answers_with_history_not_shared_between_conversations():
+    """测试带对话历史生成的寒暄回复不会提供给其他对话。"""
+    router = ModelRouter()
+    alice = FakeModels(history=["我叫Alice"])
+    bob = FakeModels(history=["我叫Bob"])
+
+    alice_reply = asyncio.run(router.process_message(alice, "谢谢"))
+    bob_reply = asyncio.run(router.process_message(bob, "谢谢"))
+    assert "Alice" in alice_reply["response"]
+    assert bob_reply["route"] == ROUTE_SIMPLE
+    assert "Alice" not in bob_reply["response"]
+    assert bob.models[ROUTE_SIMPLE].calls == 1
+
+    # 空历史下生成的回复可以复用
+    asyncio.run(router.process_message(FakeModels(), "谢谢"))
+    cached = asyncio.run(router.process_message(bob, "谢谢"))
+    assert cached["route"] == ROUTE_CACHE
+    assert cached["response"] == "simple::谢谢"
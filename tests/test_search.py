@@ -0,0 +1,125 @@
+"""消息检索测试。"""
+import random
+
+from app.services.chat_service import ChatService
+from app.services.search_index import SearchIndex, tokenize
+
+
+def test_tokenize_chinese_and_english():
+    """测试中英文混合切分。"""
+    tokens = tokenize("ChatVerse聊天机器人")
+    assert "chatverse" in tokens
+    assert "聊" in tokens
+    assert "聊天" in tokens
+    assert "机器" in tokens
+
+
+def test_search_ranked_with_filters():
+    """测试检索排序、角色与时间过滤以及分页。"""
+    service = ChatService()
+    service.save_message("c1", "user", "怎么部署聊天机器人？")
+    service.save_message("c1", "assistant", "可以使用Docker部署聊天机器人服务。")
+    service.save_message("c2", "user", "今天天气怎么样")
+
+    result = service.search("聊天机器人")
+    assert result.total == 2
+    assert {hit.conversation_id for hit in result.hits} == {"c1"}
+    assert "聊天机器人" in result.hits[0].snippet
+
+    result = service.search("聊天机器人", role="assistant")
+    assert result.total == 1
+    assert result.hits[0].message_index == 1
+
+    result = service.search("docker")
+    assert result.total == 1
+
+    cutoff = service.get_messages("c2")[0].timestamp
+    assert service.search("怎么", start_time=cutoff).total == 1
+
+    page = service.search("聊天", page=2, page_size=1)
+    assert page.total == 2
+    assert len(page.hits) == 1
+
+    assert service.search("不存在的内容").total == 0
+
+
+def test_index_rebuilt_after_restart(tmp_path):
+    """测试重启后检索索引与持久化历史一致。"""
+    service = ChatService(data_dir=str(tmp_path))
+    service.save_message("c1", "user", "检索持久化测试")
+    service.save_message("c1", "assistant", "收到")
+    service.close()
+
+    restored = ChatService(data_dir=str(tmp_path))
+    assert len(restored.get_messages("c1")) == 2
+    result = restored.search("持久化")
+    assert result.total == 1
+    assert result.hits[0].conversation_id == "c1"
+    restored.close()
+
+
+def test_index_intersects_postings():
+    """测试多词项查询只返回同时包含全部词项的消息。"""
+    index = SearchIndex()
+    index.add("c", 0, "user", 1.0, "alpha beta")
+    index.add("c", 1, "user", 2.0, "alpha")
+    index.add("c", 2, "user", 3.0, "beta alpha alpha")
+    total, exact, ranked = index.search("alpha beta")
+    assert total == 2
+    assert exact
+    assert {doc_id for doc_id, _ in ranked} == {0, 2}
+
+
+def _random_corpus(count):
+    rng = random.Random(7)
+    words = ["聊天", "部署", "模型", "docker", "天气", "服务", "日志", "配置"]
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(1, 40))) for _ in range(count)]
+
+
+def test_impact_ordered_search_matches_exhaustive_search():
+    """测试按影响力分组提前终止的检索与全量打分的前k名一致。"""
+    pruned = SearchIndex(impact_min_postings=64)
+    exhaustive = SearchIndex(impact_min_postings=10 ** 9)
+    for doc_id, content in enumerate(_random_corpus(3000)):
+        for index in (pruned, exhaustive):
+            index.add("c", doc_id, "user" if doc_id % 3 else "assistant", float(doc_id), content)
+
+    for query in ("聊天", "聊天 部署", "docker 模型 日志"):
+        for kwargs in ({}, {"role": "assistant"}, {"offset": 10, "limit": 5}):
+            total, exact, ranked = pruned.search(query, **kwargs)
+            expected_total, _, expected = exhaustive.search(query, **kwargs)
+            assert [doc_id for doc_id, _ in ranked] == [doc_id for doc_id, _ in expected]
+            if exact:
+                assert total == expected_total
+
+    # 单个常见词项提前终止时命中总数仍然精确
+    total, exact, _ = pruned.search("聊天")
+    assert exact
+    assert total == exhaustive.search("聊天")[0]
+
+
+def test_search_work_is_bounded():
+    """测试常见词项的查询只检查有限的候选文档，命中总数为估计值。"""
+    index = SearchIndex(impact_min_postings=64, max_candidates=200)
+    for doc_id, content in enumerate(_random_corpus(3000)):
+        index.add("c", doc_id, "user", float(doc_id), content)
+
+    total, exact, ranked = index.search("聊天 部署 模型 docker")
+    assert not exact
+    assert total > 0
+    assert len(ranked) == 20
+
+
+def test_search_reads_spilled_conversation_once(tmp_path, monkeypatch):
+    """测试同一转存对话的多条命中只解压一次。"""
+    service = ChatService(spill_dir=str(tmp_path), idle_seconds=0)
+    for i in range(5):
+        service.save_message("old", "user", f"检索第{i}条")
+    service.spill_idle(now=service.get_messages("old")[-1].timestamp + 1)
+
+    reads = []
+    get = service._blobs.get
+    monkeypatch.setattr(service._blobs, "get", lambda key: reads.append(key) or get(key))
+    result = service.search("检索")
+    assert len(result.hits) == 5
+    assert reads == ["old"]
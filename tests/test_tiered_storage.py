@@ -0,0 +1,119 @@
+"""对话分层存储测试。"""
+import json
+
+import pytest
+
+from app.services import chat_service
+from app.services.blob_store import BlobStore
+from app.schemas.chat import Message
+from app.services.chat_service import MESSAGE_LOG, ChatService
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_blob_store_roundtrip(tmp_path, codec):
+    """测试数据块压缩存取。"""
+    store = BlobStore(str(tmp_path), codec=codec)
+    data = ("你好，ChatVerse" * 100).encode("utf-8")
+    size = store.put("a/b", data)
+    assert size < len(data)
+    assert store.get("a/b") == data
+    assert store.total_bytes == size
+    store.delete("a/b")
+    assert "a/b" not in store
+    assert store.total_bytes == 0
+
+
+def test_idle_conversation_spilled_and_restored(tmp_path):
+    """测试空闲对话被转存，访问时透明恢复。"""
+    service = ChatService(spill_dir=str(tmp_path), idle_seconds=60)
+    spilled = []
+    service.add_spill_listener(spilled.extend)
+    service.save_message("idle", "user", "很久以前的消息" * 20)
+    service.save_message("idle", "assistant", "很久以前的回复" * 20)
+    service.save_message("active", "user", "刚刚的消息")
+
+    last = service.get_messages("idle")[-1].timestamp
+    service._load("active", accessed_at=last + 100)
+    assert service.spill_idle(now=last + 120) == ["idle"]
+    assert spilled == ["idle"]
+
+    stats = service.storage_stats()
+    assert stats["resident_conversations"] == 1
+    assert stats["spilled_conversations"] == 1
+    assert 0 < stats["spilled_bytes"] < stats["spilled_raw_bytes"]
+
+    # 检索不会把对话加载回内存
+    assert service.search("很久以前").total == 2
+    assert service.storage_stats()["spilled_conversations"] == 1
+
+    messages = service.get_messages("idle")
+    assert [m.role for m in messages] == ["user", "assistant"]
+    assert messages[1].content == "很久以前的回复" * 20
+    stats = service.storage_stats()
+    assert stats["resident_conversations"] == 2
+    assert stats["spilled_conversations"] == 0
+    assert stats["spilled_raw_bytes"] == 0
+
+    service.save_message("idle", "user", "继续聊")
+    assert len(service.get_conversation_history("idle").messages) == 3
+
+
+def test_replayed_idle_conversations_start_spilled(tmp_path):
+    """测试重启恢复时，空闲的对话直接转存而不常驻内存。"""
+    data_dir = str(tmp_path / "data")
+    service = ChatService(data_dir=data_dir)
+    service.save_message("c1", "user", "旧消息")
+    service.close()
+
+    restored = ChatService(data_dir=data_dir, spill_dir=str(tmp_path / "spill"), idle_seconds=0)
+    stats = restored.storage_stats()
+    assert stats["resident_conversations"] == 0
+    assert stats["spilled_conversations"] == 1
+    assert restored.get_messages("c1")[0].content == "旧消息"
+    restored.close()
+
+
+def test_replay_spills_idle_conversations_as_it_goes(tmp_path, monkeypatch):
+    """测试恢复消息日志时边恢复边转存，常驻对话数不随日志中的对话总数增长。"""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    with open(data_dir / MESSAGE_LOG, "w", encoding="utf-8") as f:
+        for i in range(200):
+            f.write(json.dumps({
+                "conversation_id": f"c{i}",
+                "role": "user",
+                "content": f"消息{i}",
+                "timestamp": i * 1000.0
+            }, ensure_ascii=False) + "\n")
+
+    monkeypatch.setattr(chat_service, "REPLAY_SPILL_INTERVAL", 10)
+    peak = 0
+    append = ChatService._append
+
+    def tracking_append(self, *args, **kwargs):
+        nonlocal peak
+        append(self, *args, **kwargs)
+        peak = max(peak, len(self._conversations))
+
+    monkeypatch.setattr(ChatService, "_append", tracking_append)
+    restored = ChatService(data_dir=str(data_dir), spill_dir=str(tmp_path / "spill"), idle_seconds=300)
+    assert peak <= 10
+    assert restored.storage_stats()["spilled_conversations"] == 200
+    assert restored.get_messages("c123")[0].content == "消息123"
+    restored.close()
+
+
+def test_write_path_spills_in_bounded_batches(tmp_path):
+    """测试写入路径每次最多转存spill_batch个对话，剩余的由之后的写入继续。"""
+    service = ChatService(spill_dir=str(tmp_path), idle_seconds=60, spill_batch=3)
+    spilled = []
+    service.add_spill_listener(spilled.append)
+    for i in range(7):
+        service._append(f"idle-{i}", Message(role="user", content="消息", timestamp=0.0), accessed_at=0.0)
+
+    service._maybe_spill(1000.0)
+    assert spilled == [["idle-0", "idle-1", "idle-2"]]
+    service._maybe_spill(1000.5)
+    service._maybe_spill(1001.0)
+    assert [len(batch) for batch in spilled] == [3, 3, 1]
+    assert service.storage_stats()["resident_conversations"] == 0
@@ -0,0 +1,151 @@
+"""工具运行时测试。"""
+import asyncio
+import time
+
+import pytest
+
+from app.agents.tool_runtime import (
+    EXECUTOR_INLINE,
+    EXECUTOR_THREAD,
+    ToolRuntime,
+    ToolSpec,
+    ToolTimeoutError,
+)
+
+
+def _slow(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def test_sync_tool_offloaded_without_blocking_loop():
+    """测试同步工具被卸载到线程池，不阻塞事件循环。"""
+    runtime = ToolRuntime()
+    runtime.register(ToolSpec(name="slow", func=_slow, executor=EXECUTOR_THREAD))
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        result = await runtime.acall("slow", 0.2)
+        task.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(main())
+    runtime.shutdown()
+    assert result == 0.2
+    assert ticks >= 5
+
+
+def test_timeout_is_recorded():
+    """测试工具超时会抛出异常并计入统计。"""
+    runtime = ToolRuntime()
+    runtime.register(ToolSpec(name="slow", func=_slow, timeout=0.05))
+
+    with pytest.raises(ToolTimeoutError):
+        asyncio.run(runtime.acall("slow", 0.3))
+    with pytest.raises(ToolTimeoutError):
+        runtime.call("slow", 0.3)
+    runtime.shutdown()
+
+    stats = runtime.stats()["slow"]
+    assert stats["timeouts"] == 2
+    assert stats["errors"] == 2
+
+
+def test_concurrency_limit():
+    """测试并发上限生效。"""
+    runtime = ToolRuntime()
+    running = 0
+    peak = 0
+
+    async def work():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    runtime.register(ToolSpec(name="work", func=work, max_concurrency=2))
+
+    async def main():
+        await asyncio.gather(*(runtime.acall("work") for _ in range(6)))
+
+    asyncio.run(main())
+    assert peak == 2
+    assert runtime.stats()["work"]["calls"] == 6
+
+
+def test_pure_tool_memoized():
+    """测试纯函数工具的结果会被缓存。"""
+    calls = []
+
+    def double(x: int) -> int:
+        calls.append(x)
+        return x * 2
+
+    runtime = ToolRuntime()
+    runtime.register(ToolSpec(name="double", func=double, executor=EXECUTOR_INLINE, cache_ttl=60))
+
+    assert runtime.call("double", 2) == 4
+    assert asyncio.run(runtime.acall("double", 2)) == 4
+    assert runtime.call("double", 3) == 6
+    assert calls == [2, 3]
+    assert runtime.stats()["double"]["cache_hits"] == 1
+
+
+def test_timed_out_tool_keeps_its_slot_until_finished():
+    """测试超时的工具在实际结束前不释放并发名额，不会占满执行池。"""
+    runtime = ToolRuntime(thread_workers=2)
+    runtime.register(ToolSpec(name="hang", func=_slow, timeout=0.05, max_concurrency=1))
+    runtime.register(ToolSpec(name="quick", func=_slow, timeout=0.2))
+
+    async def main():
+        for _ in range(3):
+            with pytest.raises(ToolTimeoutError):
+                await runtime.acall("hang", 0.5)
+        return await runtime.acall("quick", 0.01)
+
+    assert asyncio.run(main()) == 0.01
+    for _ in range(3):
+        with pytest.raises(ToolTimeoutError):
+            runtime.call("hang", 0.5)
+    assert runtime.call("quick", 0.01) == 0.01
+    runtime.shutdown()
+
+
+def test_async_limits_not_kept_for_closed_loops():
+    """测试同步调用异步工具时不会为每个临时事件循环保留信号量。"""
+    async def noop():
+        return 1
+
+    runtime = ToolRuntime()
+    runtime.register(ToolSpec(name="noop", func=noop))
+    for _ in range(50):
+        assert runtime.call("noop") == 1
+    assert len(runtime._async_limits) <= 1
+
+
+def test_tool_raising_timeout_error_is_an_ordinary_error():
+    """测试工具自身抛出的TimeoutError按普通错误处理，不计为超时。"""
+    def flaky():
+        raise TimeoutError("上游连接超时")
+
+    runtime = ToolRuntime()
+    for name, executor in (("inline", EXECUTOR_INLINE), ("thread", EXECUTOR_THREAD)):
+        runtime.register(ToolSpec(name=name, func=flaky, executor=executor))
+        for call in (lambda: runtime.call(name), lambda: asyncio.run(runtime.acall(name))):
+            with pytest.raises(TimeoutError, match="上游连接超时") as excinfo:
+                call()
+            assert not isinstance(excinfo.value, ToolTimeoutError)
+        stats = runtime.stats()[name]
+        assert stats["calls"] == 2
+        assert stats["errors"] == 2
+        assert stats["timeouts"] == 0
+    runtime.shutdown()
@@ -0,0 +1,153 @@
+"""上游端点池测试，使用本地桩HTTP服务。"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.utils.upstream import (
+    STATE_EJECTED,
+    STATE_HEALTHY,
+    VIRTUAL_BASE_URL,
+    AsyncPoolTransport,
+    Endpoint,
+    EndpointPool,
+    PoolTransport,
+)
+
+
+class StubServer:
+    """返回固定状态码并记录请求的桩服务。"""
+
+    def __init__(self, status=200):
+        self.status = status
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self):
+                stub.requests.append((self.command, self.path, self.headers.get("Authorization")))
+                body = json.dumps({"path": self.path}).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._reply()
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self._reply()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stubs():
+    servers = [StubServer(), StubServer()]
+    yield servers
+    for server in servers:
+        server.close()
+
+
+def test_requests_rewritten_and_balanced(stubs):
+    """测试请求被改写到各端点并替换密钥。"""
+    pool = EndpointPool([Endpoint(stubs[0].base_url, "key-a"), Endpoint(stubs[1].base_url, "key-b")])
+    with httpx.Client(transport=PoolTransport(pool), base_url=VIRTUAL_BASE_URL) as client:
+        for _ in range(10):
+            response = client.post("/chat/completions", json={}, headers={"Authorization": "Bearer x"})
+            assert response.json() == {"path": "/v1/chat/completions"}
+
+    assert stubs[0].requests and stubs[1].requests
+    assert {auth for _, _, auth in stubs[0].requests} == {"Bearer key-a"}
+    assert {auth for _, _, auth in stubs[1].requests} == {"Bearer key-b"}
+    stats = pool.stats()["endpoints"]
+    assert sum(ep["requests"] for ep in stats) == 10
+    assert all(ep["outstanding"] == 0 for ep in stats)
+
+
+def test_keyless_endpoint_receives_no_authorization(stubs):
+    """测试未配置密钥的端点不会收到客户端或其他端点的密钥。"""
+    pool = EndpointPool([Endpoint(stubs[0].base_url, "sk-real"), Endpoint(stubs[1].base_url)])
+    with httpx.Client(transport=PoolTransport(pool), base_url=VIRTUAL_BASE_URL) as client:
+        for _ in range(6):
+            client.post("/chat/completions", json={}, headers={"Authorization": "Bearer sk-real"})
+
+    assert stubs[1].requests
+    assert {auth for _, _, auth in stubs[1].requests} == {None}
+    assert {auth for _, _, auth in stubs[0].requests} == {"Bearer sk-real"}
+
+
+def test_failing_endpoint_ejected_and_restored_after_probe(stubs):
+    """测试返回429的端点被摘除，探活成功后恢复。"""
+    stubs[0].status = 429
+    bad, good = Endpoint(stubs[0].base_url, "a"), Endpoint(stubs[1].base_url, "b")
+    pool = EndpointPool([bad, good], eject_seconds=0.2)
+    with httpx.Client(transport=PoolTransport(pool), base_url=VIRTUAL_BASE_URL) as client:
+        statuses = [client.get("/chat").status_code for _ in range(6)]
+        assert statuses.count(429) == 1
+        assert bad.state == STATE_EJECTED
+
+        stubs[0].status = 200
+        time.sleep(0.25)
+        client.get("/chat")  # 触发后台探活
+        deadline = time.time() + 2
+        while bad.state != STATE_HEALTHY and time.time() < deadline:
+            time.sleep(0.01)
+
+    assert bad.state == STATE_HEALTHY
+    assert ("GET", "/v1/models", "Bearer a") in stubs[0].requests
+
+
+def test_failed_probe_backs_off(stubs):
+    """测试探活失败时摘除时长翻倍。"""
+    stubs[0].status = 500
+    pool = EndpointPool([Endpoint(stubs[0].base_url, "a")], eject_seconds=0.1)
+    endpoint = pool.acquire()
+    pool.release(endpoint, 0.01, status_code=503)
+    assert endpoint.backoff == pytest.approx(0.1)
+    time.sleep(0.15)
+    assert pool.due_probes() == [endpoint]
+    assert pool.probe(endpoint) is False
+    assert endpoint.state == STATE_EJECTED
+    assert endpoint.backoff == pytest.approx(0.2)
+
+
+def test_startup_check_ejects_unavailable_endpoints(stubs):
+    """测试启动检查并发探活并摘除不可用的端点。"""
+    stubs[0].status = 401
+    bad, good = Endpoint(stubs[0].base_url, "a"), Endpoint(stubs[1].base_url, "b")
+    pool = EndpointPool([bad, good])
+    assert asyncio.run(pool.acheck()) == [bad]
+    assert bad.state == STATE_EJECTED
+    assert good.state == STATE_HEALTHY
+
+
+def test_async_transport_prefers_least_outstanding(stubs):
+    """测试异步传输层与最少未完成请求策略。"""
+    pool = EndpointPool([Endpoint(stubs[0].base_url, "a"), Endpoint(stubs[1].base_url, "b")])
+    busy = pool.acquire()
+
+    async def main():
+        async with httpx.AsyncClient(transport=AsyncPoolTransport(pool), base_url=VIRTUAL_BASE_URL) as client:
+            for _ in range(3):
+                response = await client.get("/chat")
+                assert response.status_code == 200
+
+    asyncio.run(main())
+    idle = stubs[1] if busy.base_url == stubs[0].base_url else stubs[0]
+    assert len(idle.requests) == 3